@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import argparse
+import filecmp
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from easy_languages_anki import ankicards
+
+
+def clips_spread(
+    duration: float, clips: int, clip_seconds: float
+) -> list[tuple[str, float, float]]:
+    # like captions, one after the other over the whole video
+    step = duration / clips
+    return [
+        (
+            f"clip-{i:05}",
+            round(i * step, 3),
+            round(i * step + min(clip_seconds, step), 3),
+        )
+        for i in range(clips)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="cutting audio clips with an `ffmpeg` per clip vs a few clips per"
+        " seeking `ffmpeg`"
+    )
+    parser.add_argument("video_path", type=Path, help="path to a long video file")
+    parser.add_argument("--clips", type=int, default=300)
+    parser.add_argument("--clip-seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    video = cv2.VideoCapture(str(args.video_path))
+    duration = video.get(cv2.CAP_PROP_FRAME_COUNT) / video.get(cv2.CAP_PROP_FPS)
+    video.release()
+    clips = clips_spread(duration, args.clips, args.clip_seconds)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # clips are written next to the video
+        dirs = (Path(tmpdir) / "per_clip", Path(tmpdir) / "batched")
+        video_paths = []
+        for dir_ in dirs:
+            dir_.mkdir()
+            video_path = dir_ / args.video_path.name
+            video_path.symlink_to(args.video_path.resolve())
+            video_paths.append(str(video_path))
+
+        time_start = time.perf_counter()
+        for id_anki_card, start, end in clips:
+            ankicards.segment_audio(video_paths[0], id_anki_card, start, end)
+        elapsed_per_clip = time.perf_counter() - time_start
+
+        time_start = time.perf_counter()
+        audio_names = ankicards.segments_audio(video_paths[1], clips)
+        elapsed_batched = time.perf_counter() - time_start
+
+        _match, mismatch, errors = filecmp.cmpfiles(
+            dirs[0], dirs[1], audio_names, shallow=False
+        )
+
+    print(f"{len(clips)} clips over {duration:.0f}s of video")
+    print(f"per clip: {elapsed_per_clip:8.2f}s")
+    print(
+        f"batched:  {elapsed_batched:8.2f}s, {elapsed_per_clip / elapsed_batched:.1f}x,"
+        f" output {'DIFFERENT' if mismatch or errors else 'identical'}"
+    )
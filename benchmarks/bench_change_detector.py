@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from itertools import islice, pairwise
+
+import cv2
+
+from easy_languages_anki import changedetect, config, framesource, segmentize
+from easy_languages_anki.framesource import Frame
+
+# cutoffs the shortcuts of `tiered` are checked against ssim at besides the given one
+CUTOFFS_CHECKED = (0.8, 0.9, 0.95, 0.97, 0.99, 0.995, 0.999)
+
+
+def segment_bounds_and_comparisons(
+    frames: list[Frame], cutoff: float, frame_stride: int
+) -> tuple[list[tuple[int, int]], int]:
+    frame_similarity = changedetect.change_detector("ssim", cutoff)
+    comparisons = 0
+
+    def frame_similarity_counted(frame_prev: Frame, frame: Frame) -> float:
+        nonlocal comparisons
+        comparisons += 1
+        return frame_similarity(frame_prev, frame)
+
+    if frame_stride > 1:
+        segments = segmentize.segment_finder_strided(
+            iter(frames), cutoff, frame_similarity_counted, frame_stride
+        )
+    else:
+        segments = segmentize.segment_finder(
+            segmentize.frame_pair_generator(iter(frames)),
+            cutoff,
+            frame_similarity_counted,
+        )
+    segment_bounds = [(start, end) for start, end, _score, _frame in segments]
+
+    return segment_bounds, comparisons
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="frames/sec of each change detector on a video's subtitle regions"
+    )
+    parser.add_argument("video_path", type=str, help="path to the video file")
+    parser.add_argument("--frames", type=int, default=3000, help="frames to decode")
+    parser.add_argument(
+        "--frame-stride",
+        type=int,
+        default=8,
+        help="stride to compare against comparing every frame",
+    )
+    parser.add_argument(
+        "--caption-video-similarity-cutoff",
+        type=float,
+        default=config.SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_DEFAULT,
+        help=config.SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_HELP,
+    )
+    args = parser.parse_args()
+
+    video = cv2.VideoCapture(args.video_path)
+    region_shape = framesource.subtitle_region_shape(*framesource.video_size(video))
+    frames = [
+        frame.copy()
+        for frame in islice(
+            segmentize.frame_generator(framesource.opencv_reader(video), region_shape),
+            args.frames,
+        )
+    ]
+    frame_pairs = list(pairwise(frames))
+    cutoff = args.caption_video_similarity_cutoff
+
+    scores_reference: list[float] | None = None
+    for name in changedetect.CHANGE_DETECTORS:
+        frame_similarity = changedetect.change_detector(name, cutoff)
+
+        time_start = time.perf_counter()
+        scores = [
+            frame_similarity(frame_prev, frame) for frame_prev, frame in frame_pairs
+        ]
+        elapsed = time.perf_counter() - time_start
+
+        if scores_reference is None:
+            scores_reference = scores
+        changes = [score < cutoff for score in scores]
+        mismatches = sum(
+            change != (score_reference < cutoff)
+            for change, score_reference in zip(changes, scores_reference, strict=True)
+        )
+
+        print(
+            f"{name:>8}: {len(frame_pairs) / elapsed:9.1f} frames/sec,"
+            f" {sum(changes)} changes, {mismatches} mismatches vs ssim"
+        )
+
+    # the shortcuts are derived from the cutoff, they have to agree with ssim at any
+    assert scores_reference is not None
+    for cutoff_checked in sorted({*CUTOFFS_CHECKED, cutoff}):
+        frame_similarity = changedetect.change_detector("tiered", cutoff_checked)
+        changes = [
+            frame_similarity(frame_prev, frame) < cutoff_checked
+            for frame_prev, frame in frame_pairs
+        ]
+        mismatches = sum(
+            change != (score_reference < cutoff_checked)
+            for change, score_reference in zip(changes, scores_reference, strict=True)
+        )
+        print(
+            f"cutoff {cutoff_checked:<5}: tiered {sum(changes)} changes,"
+            f" {mismatches} mismatches vs ssim"
+        )
+
+    segment_bounds_reference: list[tuple[int, int]] | None = None
+    for frame_stride in sorted({1, args.frame_stride}):
+        time_start = time.perf_counter()
+        segment_bounds, comparisons = segment_bounds_and_comparisons(
+            frames, cutoff, frame_stride
+        )
+        elapsed = time.perf_counter() - time_start
+
+        if segment_bounds_reference is None:
+            segment_bounds_reference = segment_bounds
+        same = segment_bounds == segment_bounds_reference
+        print(
+            f"stride {frame_stride:>2}: {len(frame_pairs) / elapsed:9.1f} frames/sec,"
+            f" {comparisons} ssim calls, {len(segment_bounds)} segments"
+            f" {'identical' if same else 'DIFFERENT'} to stride 1"
+        )
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+import argparse
+import time
+from itertools import islice
+
+import cv2
+
+from easy_languages_anki import changedetect, config, framesource, segmentize
+from easy_languages_anki.framesource import Frame
+
+
+def stage_times(
+    video_path: str,
+    frame_source: str,
+    frame_similarity: changedetect.ChangeDetector,
+    frames_max: int,
+    frame_prefetch: int,
+) -> dict[str, float]:
+    video = cv2.VideoCapture(video_path)
+    region_shape = framesource.subtitle_region_shape(*framesource.video_size(video))
+    times = dict.fromkeys(("decode", "compare", "waiting for frames", "total"), 0.0)
+
+    with framesource.frame_reader(video, video_path, frame_source) as read_into:
+
+        def read_into_timed(out: Frame) -> bool:
+            time_start = time.perf_counter()
+            ret = read_into(out)
+            times["decode"] += time.perf_counter() - time_start
+            return ret
+
+        time_start_total = time.perf_counter()
+        with segmentize.frame_stream(
+            read_into_timed, region_shape, frame_prefetch
+        ) as frames_all:
+            frames = islice(frames_all, frames_max)
+            frame_prev = next(frames)
+            while True:
+                time_start = time.perf_counter()
+                frame = next(frames, None)
+                times["waiting for frames"] += time.perf_counter() - time_start
+                if frame is None:
+                    break
+
+                time_start = time.perf_counter()
+                frame_similarity(frame_prev, frame)
+                times["compare"] += time.perf_counter() - time_start
+                frame_prev = frame
+        times["total"] = time.perf_counter() - time_start_total
+
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="where the time goes decoding and comparing frames, with and"
+        " without decoding ahead on a separate thread"
+    )
+    parser.add_argument("video_path", type=str, help="path to the video file")
+    parser.add_argument("--frames", type=int, default=3000, help="frames to decode")
+    parser.add_argument(
+        "--frame-source",
+        type=str,
+        choices=framesource.FRAME_SOURCES,
+        default=config.SEGMENTIZE_FRAME_SOURCE_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_SOURCE_HELP,
+    )
+    parser.add_argument(
+        "--change-detector",
+        type=str,
+        choices=changedetect.CHANGE_DETECTORS,
+        default=config.SEGMENTIZE_CHANGE_DETECTOR_DEFAULT,
+        help=config.SEGMENTIZE_CHANGE_DETECTOR_HELP,
+    )
+    parser.add_argument(
+        "--frame-prefetch",
+        type=int,
+        default=config.SEGMENTIZE_FRAME_PREFETCH_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_PREFETCH_HELP,
+    )
+    args = parser.parse_args()
+
+    frame_similarity = changedetect.change_detector(
+        args.change_detector, config.SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_DEFAULT
+    )
+    for frame_prefetch in sorted({0, args.frame_prefetch}):
+        times = stage_times(
+            args.video_path,
+            args.frame_source,
+            frame_similarity,
+            args.frames,
+            frame_prefetch,
+        )
+        # with the decoding hidden behind comparing, the consumer never waits for it
+        hidden = max(1 - times["waiting for frames"] / times["decode"], 0)
+        print(
+            f"prefetch {frame_prefetch:>2}: "
+            + ", ".join(f"{stage} {seconds:6.2f}s" for stage, seconds in times.items())
+            + f" ({hidden:.0%} of decoding hidden)"
+        )
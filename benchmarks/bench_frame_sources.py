@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from easy_languages_anki import framesource
+from easy_languages_anki.framesource import Frame
+
+
+def frames_read(video_path: str, frame_source: str, frames_max: int) -> list[Frame]:
+    video = cv2.VideoCapture(video_path)
+    region_shape = framesource.subtitle_region_shape(*framesource.video_size(video))
+    frames = []
+    with framesource.frame_reader(video, video_path, frame_source) as read_into:
+        frame: Frame = np.empty(region_shape, np.uint8)
+        while len(frames) < frames_max and read_into(frame):
+            frames.append(frame.copy())
+    video.release()
+    return frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="decoding the subtitle region with each frame source, and whether"
+        " they hand segmentize the same frames"
+    )
+    parser.add_argument("video_path", type=str, help="path to the video file")
+    parser.add_argument("--frames", type=int, default=1000, help="frames to decode")
+    args = parser.parse_args()
+
+    frames_by_source = {}
+    for frame_source in framesource.FRAME_SOURCES:
+        time_start = time.perf_counter()
+        frames_by_source[frame_source] = frames_read(
+            args.video_path, frame_source, args.frames
+        )
+        elapsed = time.perf_counter() - time_start
+        frames = len(frames_by_source[frame_source])
+        print(f"{frame_source:>7}: {frames} frames, {frames / elapsed:7.1f} frames/s")
+
+    frames_opencv, frames_ffmpeg = (
+        frames_by_source[frame_source] for frame_source in ("opencv", "ffmpeg")
+    )
+    differences = [
+        np.abs(frame_opencv.astype(np.int16) - frame_ffmpeg).max()
+        for frame_opencv, frame_ffmpeg in zip(
+            frames_opencv, frames_ffmpeg, strict=False
+        )
+    ]
+    frames_different = sum(difference > 0 for difference in differences)
+    print(
+        f"frames {'identical' if not frames_different else 'DIFFERENT'}:"
+        f" {frames_different} differ, by up to {max(differences, default=0)} levels"
+        + (
+            f", {len(frames_opencv)} vs {len(frames_ffmpeg)} frames"
+            if len(frames_opencv) != len(frames_ffmpeg)
+            else ""
+        )
+    )
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import argparse
+import filecmp
+import tempfile
+import time
+from pathlib import Path
+
+from easy_languages_anki import segmentize
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="wall time of `segmentize` as the number of workers grows"
+    )
+    parser.add_argument("video_path", type=str, help="path to the video file")
+    parser.add_argument("language", type=str, help="language to do ocr with")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    language = f"{args.language}+eng"
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outfiles: list[Path] = []
+        elapsed_serial: float | None = None
+        for workers in args.workers:
+            outfile = Path(tmpdir) / f"segments_raw_{workers}.csv"
+
+            time_start = time.perf_counter()
+            # without the ocr cache, or every run after the first only measures its
+            # hits, and without writing the caption box to the user's profiles
+            segmentize.segmentize(
+                args.video_path,
+                language,
+                str(outfile),
+                segmentize.SEGMENTIZE_SETTINGS_DEFAULT._replace(
+                    workers=workers, ocr_cache_path=None, layout_profiles=None
+                ),
+            )
+            elapsed = time.perf_counter() - time_start
+
+            elapsed_serial = elapsed_serial or elapsed
+            same = not outfiles or filecmp.cmp(outfiles[0], outfile, shallow=False)
+            outfiles.append(outfile)
+
+            print(
+                f"{workers:>2} workers: {elapsed:8.1f}s,"
+                f" {elapsed_serial / elapsed:4.2f}x,"
+                f" output {'identical' if same else 'DIFFERENT'}"
+            )
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import timeit
+
+from easy_languages_anki import stringdistance
+
+CAPTION = "Me gusta mucho el café por la mañana\nI really like coffee in the morning"
+CAPTION_OCR_NOISE = (
+    "Me gusta rnucho el cafe por la manana\nI really Iike coffee in the moming"
+)
+CAPTION_OTHER = (
+    "Vamos a la playa este fin de semana\nLet's go to the beach this weekend"
+)
+
+ALPHABETS = ("ab", "abcdefgh", "ñáé \nxyz", "abcdefghijklmnopqrstuvwxyz ")
+CUTOFFS = (-0.5, 0.0, 0.5, 0.7, 0.9, 0.99, 1.0)
+# the rest of the pairs are unrelated strings
+MUTATED_PAIR_RATIO = 0.7
+
+
+# the original pure python dp, kept as the reference to check against
+def levenshtein_distance_reference(str1, str2):
+    if len(str1) < len(str2):
+        return levenshtein_distance_reference(str2, str1)
+
+    if len(str2) == 0:
+        return len(str1)
+
+    previous_row = range(len(str2) + 1)
+    for i, c1 in enumerate(str1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(str2):
+            insertions = previous_row[j + 1] + 1
+            deletions = current_row[j] + 1
+            substitutions = previous_row[j] + (c1 != c2)
+            current_row.append(min(insertions, deletions, substitutions))
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+def levenshtein_similarity_reference(str1, str2):
+    distance = levenshtein_distance_reference(str1, str2)
+    if distance == 0:
+        return 1
+
+    return 1 - (distance / max(len(str1), len(str2)))
+
+
+def string_random(rng: random.Random, alphabet: str, length: int) -> str:
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def string_mutated(rng: random.Random, alphabet: str, string: str) -> str:
+    chars = list(string)
+    for _ in range(rng.randint(0, 8)):
+        i = rng.randint(0, len(chars))
+        op = rng.choice(("insert", "delete", "substitute"))
+        if op == "insert":
+            chars.insert(i, rng.choice(alphabet))
+        elif i < len(chars) and op == "delete":
+            del chars[i]
+        elif i < len(chars):
+            chars[i] = rng.choice(alphabet)
+    return "".join(chars)
+
+
+def fuzz(iterations: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(iterations):
+        alphabet = rng.choice(ALPHABETS)
+        str1 = string_random(rng, alphabet, rng.randint(0, 100))
+        if rng.random() < MUTATED_PAIR_RATIO:
+            str2 = string_mutated(rng, alphabet, str1)
+        else:
+            str2 = string_random(rng, alphabet, rng.randint(0, 100))
+
+        distance = levenshtein_distance_reference(str1, str2)
+        similarity = levenshtein_similarity_reference(str1, str2)
+        max_distance = rng.randint(0, 20)
+
+        assert stringdistance.levenshtein_distance(str1, str2) == distance
+        assert stringdistance.levenshtein_distance_bounded(
+            str1, str2, max_distance
+        ) == min(distance, max_distance + 1)
+        for cutoff in CUTOFFS:
+            assert stringdistance.levenshtein_similarity_exceeds(
+                str1, str2, cutoff
+            ) == (similarity > cutoff), (str1, str2, cutoff)
+
+
+def time_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="check the levenshtein engine against the reference dp and time it"
+    )
+    parser.add_argument("--iterations", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fuzz(args.iterations, args.seed)
+    print(f"fuzz: {args.iterations} random string pairs agree with the reference")
+
+    timings = {
+        "reference distance": time_us(
+            lambda: levenshtein_distance_reference(CAPTION, CAPTION_OCR_NOISE), 200
+        ),
+        "myers distance": time_us(
+            lambda: stringdistance.levenshtein_distance(CAPTION, CAPTION_OCR_NOISE),
+            2000,
+        ),
+        "exceeds, similar": time_us(
+            lambda: stringdistance.levenshtein_similarity_exceeds(
+                CAPTION, CAPTION_OCR_NOISE, 0.7
+            ),
+            2000,
+        ),
+        "exceeds, different": time_us(
+            lambda: stringdistance.levenshtein_similarity_exceeds(
+                CAPTION, CAPTION_OTHER, 0.7
+            ),
+            2000,
+        ),
+    }
+    for name, microseconds in timings.items():
+        print(f"{name:>20}: {microseconds:8.1f}us")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from fixtures import sentences_random
+
+from easy_languages_anki import config
+
+SENTENCES = 500
+
+# each is run in a fresh interpreter so what one loaded doesn't count for another
+VARIANTS = ("import", "full", "trimmed")
+
+
+def variant_run(variant: str, model: str, exclude: tuple[str, ...]) -> None:
+    # prints what it took as json, to be read by the parent process
+    time_start = time.perf_counter()
+    from vocab import vocab  # noqa: PLC0415
+
+    elapsed_import = time.perf_counter() - time_start
+
+    lemmas: list[str] = []
+    elapsed_load = 0.0
+    if variant != "import":
+        time_start = time.perf_counter()
+        if variant == "full":
+            import spacy  # noqa: PLC0415
+
+            nlp = spacy.load(model)
+        else:
+            nlp = vocab.nlp_load(vocab.NlpSettings(model, exclude))
+        elapsed_load = time.perf_counter() - time_start
+
+        lemmas = [
+            " ".join(token.lemma_ for token in nlp(sentence.lower()))
+            for sentence in sentences_random(random.Random(0), SENTENCES)
+        ]
+        pipe_names = nlp.pipe_names
+    else:
+        pipe_names = []
+
+    print(
+        json.dumps(
+            {
+                "import_seconds": elapsed_import,
+                "load_seconds": elapsed_load,
+                # kilobytes on linux
+                "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                "pipe_names": pipe_names,
+                "lemmas": lemmas,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="startup time and peak memory of importing `vocab`, and of"
+        " loading the whole spacy model vs only what lemmatizing needs"
+    )
+    parser.add_argument("--model", type=str, default=config.VOCAB_SPACY_MODEL_DEFAULT)
+    parser.add_argument(
+        "--exclude",
+        type=str,
+        nargs="*",
+        default=list(config.VOCAB_SPACY_EXCLUDE_DEFAULT),
+    )
+    parser.add_argument("--variant", type=str, choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant is not None:
+        variant_run(args.variant, args.model, tuple(args.exclude))
+        sys.exit()
+
+    results = {}
+    for variant in VARIANTS:
+        completed_process = subprocess.run(
+            [
+                sys.executable,
+                __file__,
+                "--variant",
+                variant,
+                "--model",
+                args.model,
+                "--exclude",
+                *args.exclude,
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results[variant] = json.loads(completed_process.stdout.splitlines()[-1])
+
+    for variant, result in results.items():
+        print(
+            f"{variant:<8} import {result['import_seconds']:6.2f}s"
+            f"  load {result['load_seconds']:6.2f}s"
+            f"  max rss {result['max_rss_mb']:7.1f}MB"
+            f"  {' '.join(result['pipe_names'])}"
+        )
+    lemmas_same = results["full"]["lemmas"] == results["trimmed"]["lemmas"]
+    print(
+        f"lemmas of {SENTENCES} sentences {'identical' if lemmas_same else 'DIFFERENT'}"
+    )
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+import argparse
+import configparser
+import csv
+import random
+import shutil
+import subprocess
+from pathlib import Path
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from easy_languages_anki.segment import Segment
+
+# opencv only draws ascii, so no accents
+CAPTIONS = (
+    ("Hola, que tal?", "Hi, how are you?"),
+    ("Me gusta mucho el cafe por la manana", "I really like coffee in the morning"),
+    ("Vamos a la playa este fin de semana", "Let's go to the beach this weekend"),
+    ("Donde esta la biblioteca?", "Where is the library?"),
+    ("No se, nunca he estado aqui", "I don't know, I've never been here"),
+    ("Mi hermana vive en Madrid", "My sister lives in Madrid"),
+    ("Que haces normalmente los domingos?", "What do you usually do on Sundays?"),
+    ("Prefiero quedarme en casa", "I prefer to stay at home"),
+    ("Cuanto cuesta esto?", "How much does this cost?"),
+    ("Es demasiado caro para mi", "It's too expensive for me"),
+    ("Hace mucho calor hoy", "It's very hot today"),
+    (
+        "Trabajo en un hospital desde hace cinco anos",
+        "I've worked in a hospital for five years",
+    ),
+)
+
+# spanish-ish words to build large synthetic card sets from
+WORDS = (
+    "el la los las un una de del en con por para que y o pero como cuando donde "
+    "yo tu el ella nosotros ellos ser estar tener hacer ir ver dar saber querer "
+    "llegar pasar deber poner parecer quedar creer hablar llevar dejar seguir "
+    "encontrar llamar venir pensar salir volver tomar conocer vivir sentir casa "
+    "dia tiempo ano vez cosa hombre mujer vida mano parte nino ojo trabajo punto "
+    "gobierno pais mundo ciudad calle playa cafe libro agua noche manana tarde "
+    "bueno malo grande pequeno nuevo viejo mucho poco siempre nunca hoy ayer"
+)
+
+# how often there's a gap without captions before the next one
+CAPTION_GAP_CHANCE = 0.3
+
+# noise frames to pick from for each frame
+NOISE_FRAMES = 8
+
+
+class FixtureCaption(NamedTuple):
+    start_frame: int
+    end_frame: int
+    learning: str
+    english: str
+
+
+class Fixture(NamedTuple):
+    video_path: Path
+    video_ini_path: Path
+    # the captions as shown, in the format of `40_segments_cleaned.csv`
+    segments_path: Path
+    captions: list[FixtureCaption]
+    fps: int
+
+
+def caption_schedule(
+    rng: random.Random, frames_total: int, fps: int
+) -> list[FixtureCaption]:
+    # captions shown for 1.5-4s
+    captions: list[FixtureCaption] = []
+    frame = 0
+    while True:
+        if rng.random() < CAPTION_GAP_CHANCE:
+            frame += int(rng.uniform(0.3, 1) * fps)
+        frames_shown = int(rng.uniform(1.5, 4) * fps)
+        if frame + frames_shown > frames_total:
+            break
+        learning, english = rng.choice(CAPTIONS)
+        captions.append(
+            FixtureCaption(frame, frame + frames_shown - 1, learning, english)
+        )
+        frame += frames_shown
+    return captions
+
+
+def caption_line_draw(
+    frame: np.ndarray, text: str, baseline: int, scale: float, color: tuple
+) -> None:
+    width = frame.shape[1]
+    thickness = max(int(scale * 2), 1)
+    (text_width, _), _ = cv2.getTextSize(
+        text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness
+    )
+    origin = ((width - text_width) // 2, baseline)
+    # dark outline under the text, like the channels' captions
+    cv2.putText(
+        frame,
+        text,
+        origin,
+        cv2.FONT_HERSHEY_SIMPLEX,
+        scale,
+        (0, 0, 0),
+        thickness * 4,
+        cv2.LINE_AA,
+    )
+    cv2.putText(
+        frame,
+        text,
+        origin,
+        cv2.FONT_HERSHEY_SIMPLEX,
+        scale,
+        color,
+        thickness,
+        cv2.LINE_AA,
+    )
+
+
+def frame_render(
+    frame_num: int,
+    width: int,
+    height: int,
+    caption: FixtureCaption | None,
+    noise: np.ndarray,
+) -> np.ndarray:
+    # a slowly panning gradient with a moving object and sensor noise, so consecutive
+    # frames are never identical
+    x = np.linspace(0, 1, width, dtype=np.float32)
+    y = np.linspace(0, 1, height, dtype=np.float32)[:, None]
+    shade = 60 + 60 * np.sin(2 * np.pi * (x + frame_num / 300)) * y + 40 * y
+    frame = cv2.merge((0.8 * shade, shade, shade))
+    frame = cv2.add(frame, noise, dtype=cv2.CV_8U)
+
+    object_x = int((frame_num * 4) % (width + 200)) - 200
+    cv2.rectangle(
+        frame,
+        (object_x, height // 6),
+        (object_x + 200, height * 5 // 6),
+        (40, 120, 180),
+        -1,
+    )
+
+    if caption is not None:
+        scale = height / 720
+        caption_line_draw(
+            frame, caption.learning, int(0.84 * height), scale, (255, 255, 255)
+        )
+        caption_line_draw(
+            frame, caption.english, int(0.9 * height), scale * 0.9, (0, 230, 255)
+        )
+    return frame
+
+
+def audio_add(video_path: Path, seconds: float) -> None:
+    # `ankicards` copies the audio stream out, so the fixture needs one
+    video_path_silent = video_path.with_name(f"{video_path.stem}_silent.mp4")
+    video_path.rename(video_path_silent)
+    subprocess.run(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-y",
+            "-i",
+            str(video_path_silent),
+            "-f",
+            "lavfi",
+            "-i",
+            f"sine=frequency=440:duration={seconds}",
+            "-c:v",
+            "copy",
+            "-c:a",
+            "aac",
+            "-shortest",
+            str(video_path),
+        ],
+        check=True,
+    )
+    video_path_silent.unlink()
+
+
+def fixture_video(
+    out_dir: Path,
+    seconds: float = 60,
+    fps: int = 30,
+    width: int = 1280,
+    height: int = 720,
+    seed: int = 0,
+    video_id: str = "fixture",
+) -> Fixture:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    video_path = out_dir / f"{video_id}.mp4"
+    video_ini_path = out_dir / f"{video_id}.ini"
+    segments_path = out_dir / f"{video_id}_segments.csv"
+
+    frames_total = int(seconds * fps)
+    captions = caption_schedule(random.Random(seed), frames_total, fps)
+    frame_captions: list[FixtureCaption | None] = [None] * frames_total
+    for caption in captions:
+        for frame_num in range(caption.start_frame, caption.end_frame + 1):
+            frame_captions[frame_num] = caption
+
+    rng = np.random.default_rng(seed)
+    # drawing fresh noise for every frame is most of the rendering time
+    noises = rng.normal(0, 1.5, (NOISE_FRAMES, height, width, 3)).astype(np.float32)
+    writer = cv2.VideoWriter(
+        str(video_path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+    )
+    for frame_num, caption in enumerate(frame_captions):
+        noise = noises[rng.integers(NOISE_FRAMES)]
+        writer.write(frame_render(frame_num, width, height, caption, noise))
+    writer.release()
+
+    if shutil.which("ffmpeg") is not None:
+        audio_add(video_path, seconds)
+    else:
+        print("[warn] `ffmpeg` not found, the fixture video has no audio")
+
+    config = configparser.ConfigParser()
+    config["video"] = {
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "id": video_id,
+        "title": f"{video_id} ({seconds}s synthetic captions)",
+        "channel": "fixture",
+    }
+    with open(video_ini_path, "w") as configfile:
+        config.write(configfile)
+
+    with open(segments_path, "w", newline="") as f:
+        writer_csv = csv.writer(f)
+        writer_csv.writerow(Segment._fields)
+        for caption in captions:
+            writer_csv.writerow(
+                Segment(
+                    str(caption.start_frame),
+                    str(caption.end_frame),
+                    caption.learning,
+                    caption.english,
+                )
+            )
+
+    return Fixture(video_path, video_ini_path, segments_path, captions, fps)
+
+
+def sentences_random(rng: random.Random, count: int) -> list[str]:
+    words = WORDS.split()
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(3, 14)))
+        for _ in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="render a video with two-line captions like the easy-languages"
+        " videos, with the ini and the shown captions next to it"
+    )
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fixture = fixture_video(
+        args.out_dir, args.seconds, args.fps, args.width, args.height, args.seed
+    )
+    print(f"{fixture.video_path}: {len(fixture.captions)} captions")
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import cv2
+from fixtures import (
+    CAPTIONS,
+    Fixture,
+    FixtureCaption,
+    fixture_video,
+    sentences_random,
+)
+
+from easy_languages_anki import ankicards, config, segmentize, stringdistance
+from easy_languages_anki.segment import AnkiVideoFrameCard, SegmentRawText
+
+type Metrics = dict[str, float]
+
+# a segment found for a caption may start or end this many frames off
+CAPTION_FRAMES_TOLERANCE = 2
+
+LEVENSHTEIN_PAIRS = 5000
+# the rest of the pairs are two different captions
+MUTATED_PAIR_RATIO = 0.7
+VOCAB_SENTENCES = 2000
+VOCAB_CARDS = 5000
+
+
+def fixture_cached(fixture_dir: Path, seconds: float, seed: int) -> Fixture:
+    # rendering is deterministic, so a video rendered earlier is the same one
+    out_dir = fixture_dir / f"fixture-{seconds:g}s-{seed}"
+    fixture_path = out_dir / "fixture.json"
+    if fixture_path.exists():
+        with open(fixture_path) as f:
+            fixture = json.load(f)
+        return Fixture(
+            Path(fixture["video_path"]),
+            Path(fixture["video_ini_path"]),
+            Path(fixture["segments_path"]),
+            [FixtureCaption(*caption) for caption in fixture["captions"]],
+            fixture["fps"],
+        )
+
+    print(f"rendering a {seconds:g}s fixture video to {out_dir}")
+    fixture = fixture_video(out_dir, seconds, seed=seed, video_id="fixture")
+    with open(fixture_path, "w") as f:
+        json.dump(
+            {
+                **fixture._asdict(),
+                "video_path": str(fixture.video_path),
+                "video_ini_path": str(fixture.video_ini_path),
+                "segments_path": str(fixture.segments_path),
+            },
+            f,
+        )
+    return fixture
+
+
+def segments_raw_read(path: Path) -> list[SegmentRawText]:
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)
+        return [SegmentRawText._make(row) for row in reader]
+
+
+def bench_segmentize(fixture: Fixture, work_dir: Path, lang: str) -> Metrics:
+    outfile = work_dir / "segments_raw.csv"
+    video = cv2.VideoCapture(str(fixture.video_path))
+    frames_total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    video.release()
+
+    time_start = time.perf_counter()
+    segmentize.segmentize(
+        str(fixture.video_path),
+        lang,
+        str(outfile),
+        segmentize.SEGMENTIZE_SETTINGS_DEFAULT._replace(
+            ocr_cache_path=None, layout_profiles=None
+        ),
+    )
+    elapsed = time.perf_counter() - time_start
+
+    segments = segments_raw_read(outfile)
+    segments_by_frames = {
+        (int(segment.start_frame), int(segment.end_frame)): segment.text
+        for segment in segments
+    }
+    similarities = []
+    for caption in fixture.captions:
+        text = next(
+            (
+                text
+                for (start, end), text in segments_by_frames.items()
+                if abs(start - caption.start_frame) <= CAPTION_FRAMES_TOLERANCE
+                and abs(end - caption.end_frame) <= CAPTION_FRAMES_TOLERANCE
+            ),
+            None,
+        )
+        if text is not None:
+            similarities.append(
+                stringdistance.levenshtein_similarity(
+                    text, f"{caption.learning}\n{caption.english}"
+                )
+            )
+
+    return {
+        "seconds": elapsed,
+        "frames_per_second": frames_total / elapsed,
+        "segments": len(segments),
+        "captions": len(fixture.captions),
+        "captions_found": len(similarities),
+        "caption_text_similarity": (
+            sum(similarities) / len(similarities) if similarities else 0.0
+        ),
+    }
+
+
+def bench_levenshtein(fixture: Fixture, work_dir: Path, lang: str) -> Metrics:
+    rng = random.Random(0)
+    texts = [f"{learning}\n{english}" for learning, english in CAPTIONS]
+    # mostly the same caption ocr'd slightly differently, like when joining segments
+    pairs = []
+    for _ in range(LEVENSHTEIN_PAIRS):
+        text = rng.choice(texts)
+        if rng.random() < MUTATED_PAIR_RATIO:
+            chars = list(text)
+            for _ in range(rng.randint(0, 4)):
+                chars[rng.randrange(len(chars))] = rng.choice("il1rnm ")
+            pairs.append((text, "".join(chars)))
+        else:
+            pairs.append((text, rng.choice(texts)))
+
+    cutoff = config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT
+    time_start = time.perf_counter()
+    for str1, str2 in pairs:
+        stringdistance.levenshtein_distance(str1, str2)
+    elapsed_distance = time.perf_counter() - time_start
+
+    time_start = time.perf_counter()
+    for str1, str2 in pairs:
+        stringdistance.levenshtein_similarity_exceeds(str1, str2, cutoff)
+    elapsed_exceeds = time.perf_counter() - time_start
+
+    return {
+        "distance_pairs_per_second": len(pairs) / elapsed_distance,
+        "similarity_exceeds_pairs_per_second": len(pairs) / elapsed_exceeds,
+    }
+
+
+def bench_ankicards(fixture: Fixture, work_dir: Path, lang: str) -> Metrics:
+    # media is written next to the video, so keep it out of the fixture directory
+    video_path = work_dir / fixture.video_path.name
+    video_path.symlink_to(fixture.video_path.resolve())
+    outfile = work_dir / "cards.csv"
+
+    time_start = time.perf_counter()
+    ankicards.segments_to_frame_cards(
+        str(video_path),
+        str(fixture.video_ini_path),
+        str(fixture.segments_path),
+        str(outfile),
+    )
+    elapsed = time.perf_counter() - time_start
+
+    with open(outfile, newline="") as f:
+        cards = sum(1 for _ in csv.reader(f)) - 1
+    return {"seconds": elapsed, "cards": cards, "cards_per_second": cards / elapsed}
+
+
+def bench_vocab(fixture: Fixture, work_dir: Path, lang: str) -> Metrics:
+    from vocab import expander, vocab  # noqa: PLC0415
+
+    # the spacy model is loaded on first use
+    time_start = time.perf_counter()
+    vocab.nlp_load()
+    elapsed_load = time.perf_counter() - time_start
+
+    rng = random.Random(0)
+    sentences = sentences_random(rng, VOCAB_SENTENCES)
+    time_start = time.perf_counter()
+    vocab_known = vocab.from_strings(sentences)
+    elapsed_from_strings = time.perf_counter() - time_start
+
+    cards = [
+        AnkiVideoFrameCard(
+            learning,
+            "",
+            f"{i}.aac",
+            f"{i}.jpg",
+            "fixture",
+            "https://www.youtube.com/watch?v=fixture",
+            f"fixture-{i}",
+            "",
+        )
+        for i, learning in enumerate(sentences_random(rng, VOCAB_CARDS))
+    ]
+    time_start = time.perf_counter()
+    diff = expander.ankicards_diff_from_known_vocab(vocab_known, cards)
+    cards_diffed = sum(len(list(cards_diff)) for _, cards_diff in diff)
+    elapsed_diff = time.perf_counter() - time_start
+
+    return {
+        "model_load_seconds": elapsed_load,
+        "from_strings_sentences_per_second": len(sentences) / elapsed_from_strings,
+        "expander_cards_per_second": cards_diffed / elapsed_diff,
+    }
+
+
+BENCHMARKS: dict[str, Callable[[Fixture, Path, str], Metrics]] = {
+    "segmentize": bench_segmentize,
+    "levenshtein": bench_levenshtein,
+    "ankicards": bench_ankicards,
+    "vocab": bench_vocab,
+}
+
+
+def commit() -> str | None:
+    try:
+        completed_process = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed_process.stdout.strip()
+
+
+def results_compare(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    # per metric, how this run compares to the baseline, higher is more
+    for name, metrics in results["benchmarks"].items():
+        metrics_baseline = baseline["benchmarks"].get(name, {})
+        for metric, value in metrics.items():
+            value_baseline = metrics_baseline.get(metric)
+            if not value_baseline:
+                continue
+            print(
+                f"{name:>12} {metric:<36} {value_baseline:12.3f} -> {value:12.3f}"
+                f" ({value / value_baseline:5.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="run the benchmarks on a synthetic captioned video and write the"
+        " results as json"
+    )
+    parser.add_argument(
+        "--out", type=Path, default=Path("benchmark-results.json"), help="results file"
+    )
+    parser.add_argument(
+        "--only",
+        type=str,
+        nargs="+",
+        choices=BENCHMARKS.keys(),
+        default=list(BENCHMARKS.keys()),
+        help="benchmarks to run (default all)",
+    )
+    parser.add_argument(
+        "--fixture-dir",
+        type=Path,
+        default=Path(config.CACHE_DIR) / "benchmarks",
+        help="where the synthetic video is rendered to",
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=60, help="length of the synthetic video"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--lang", type=str, default="spa+eng", help="language to do ocr with"
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        required=False,
+        help="results file from an earlier run to compare against",
+    )
+    args = parser.parse_args()
+
+    fixture = fixture_cached(args.fixture_dir, args.seconds, args.seed)
+
+    results: dict[str, Any] = {
+        "commit": commit(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "fixture": {
+            "seconds": args.seconds,
+            "seed": args.seed,
+            "captions": len(fixture.captions),
+        },
+        "benchmarks": {},
+    }
+    for name in args.only:
+        print(f"running {name}")
+        with tempfile.TemporaryDirectory() as work_dir:
+            metrics = BENCHMARKS[name](fixture, Path(work_dir), args.lang)
+        results["benchmarks"][name] = metrics
+        print(f"{name}: {json.dumps(metrics)}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            results_compare(results, json.load(f))
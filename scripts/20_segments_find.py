@@ -1,7 +1,14 @@
 #!/usr/bin/env python3
 import argparse
 
-from easy_languages_anki import config, segmentize
+from easy_languages_anki import (
+    changedetect,
+    config,
+    framesource,
+    imagetotext,
+    segmentize,
+    subtitlelayout,
+)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="find segments in easy-language video")
@@ -19,6 +26,105 @@ if __name__ == "__main__":
         default=config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT,
         help=config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_HELP,
     )
+    parser.add_argument(
+        "--frame-source",
+        type=str,
+        choices=framesource.FRAME_SOURCES,
+        default=config.SEGMENTIZE_FRAME_SOURCE_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_SOURCE_HELP,
+    )
+    parser.add_argument(
+        "--change-detector",
+        type=str,
+        choices=changedetect.CHANGE_DETECTORS,
+        default=config.SEGMENTIZE_CHANGE_DETECTOR_DEFAULT,
+        help=config.SEGMENTIZE_CHANGE_DETECTOR_HELP,
+    )
+    parser.add_argument(
+        "--frame-stride",
+        type=int,
+        default=config.SEGMENTIZE_FRAME_STRIDE_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_STRIDE_HELP,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.SEGMENTIZE_WORKERS_DEFAULT,
+        help=config.SEGMENTIZE_WORKERS_HELP,
+    )
+    parser.add_argument(
+        "--ocr-engine",
+        type=str,
+        choices=imagetotext.OCR_ENGINES,
+        default=config.SEGMENTIZE_OCR_ENGINE_DEFAULT,
+        help=config.SEGMENTIZE_OCR_ENGINE_HELP,
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=config.SEGMENTIZE_OCR_WORKERS_DEFAULT,
+        help=config.SEGMENTIZE_OCR_WORKERS_HELP,
+    )
+    parser.add_argument(
+        "--ocr-cache",
+        type=str,
+        default=config.SEGMENTIZE_OCR_CACHE_DEFAULT,
+        help=config.SEGMENTIZE_OCR_CACHE_HELP,
+    )
+    parser.add_argument(
+        "--no-ocr-cache",
+        dest="ocr_cache",
+        action="store_const",
+        const=None,
+        help="don't cache ocr results",
+    )
+    parser.add_argument(
+        "--ocr-cache-max-entries",
+        type=int,
+        default=config.SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_DEFAULT,
+        help=config.SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_HELP,
+    )
+    parser.add_argument(
+        "--subtitle-layout",
+        type=str,
+        choices=subtitlelayout.SUBTITLE_LAYOUTS,
+        default=config.SEGMENTIZE_SUBTITLE_LAYOUT_DEFAULT,
+        help=config.SEGMENTIZE_SUBTITLE_LAYOUT_HELP,
+    )
+    parser.add_argument(
+        "--subtitle-layout-profiles",
+        type=str,
+        default=config.SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_DEFAULT,
+        help=config.SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_HELP,
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue from where an interrupted run on the same outfile left off",
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=config.SEGMENTIZE_CHECKPOINT_EVERY_DEFAULT,
+        help=config.SEGMENTIZE_CHECKPOINT_EVERY_HELP,
+    )
+    parser.add_argument(
+        "--frame-prefetch",
+        type=int,
+        default=config.SEGMENTIZE_FRAME_PREFETCH_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_PREFETCH_HELP,
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help=config.SEGMENTIZE_PROFILE_HELP,
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help=config.SEGMENTIZE_THUMBNAILS_HELP,
+    )
     parser.add_argument(
         "--outfile",
         "-o",
@@ -36,8 +142,25 @@ if __name__ == "__main__":
         args.video_path,
         language,
         args.outfile,
-        args.caption_video_similarity_cutoff,
-        args.caption_text_similarity_cutoff,
+        segmentize.SegmentizeSettings(
+            args.caption_video_similarity_cutoff,
+            args.caption_text_similarity_cutoff,
+            args.frame_source,
+            args.change_detector,
+            args.frame_stride,
+            args.workers,
+            args.ocr_engine,
+            args.ocr_workers,
+            args.ocr_cache,
+            args.ocr_cache_max_entries,
+            args.subtitle_layout,
+            args.subtitle_layout_profiles,
+            args.checkpoint_every,
+            args.frame_prefetch,
+            args.profile,
+            args.thumbnails,
+        ),
+        args.resume,
     )
 
     print("done!")
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 
-from easy_languages_anki import ankicards
+from easy_languages_anki import ankicards, config, mediastore
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="clean found segments")
@@ -15,15 +15,70 @@ if __name__ == "__main__":
         type=bool,
         default=False,
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=config.ANKICARDS_JOBS_DEFAULT,
+        help=config.ANKICARDS_JOBS_HELP,
+    )
+    parser.add_argument(
+        "--thumbnails",
+        type=str,
+        default=None,
+        help=config.ANKICARDS_THUMBNAILS_HELP,
+    )
+    parser.add_argument(
+        "--media-store",
+        type=str,
+        default=config.ANKICARDS_MEDIA_STORE_DEFAULT,
+        help=config.ANKICARDS_MEDIA_STORE_HELP,
+    )
+    parser.add_argument(
+        "--frame-height",
+        type=int,
+        default=config.ANKICARDS_FRAME_HEIGHT_DEFAULT,
+        help=config.ANKICARDS_FRAME_HEIGHT_HELP,
+    )
+    parser.add_argument(
+        "--frame-format",
+        type=str,
+        choices=mediastore.FRAME_FORMATS,
+        default=config.ANKICARDS_FRAME_FORMAT_DEFAULT,
+        help=config.ANKICARDS_FRAME_FORMAT_HELP,
+    )
+    parser.add_argument(
+        "--frame-quality",
+        type=int,
+        default=config.ANKICARDS_FRAME_QUALITY_DEFAULT,
+        help=config.ANKICARDS_FRAME_QUALITY_HELP,
+    )
     args = parser.parse_args()
 
     if args.use_full_video:
-        ankicards.segments_to_video_cards(
-            args.video_path, args.video_ini_path, args.infile, args.outfile
+        segment_jobs = ankicards.segments_to_video_cards(
+            args.video_path, args.video_ini_path, args.infile, args.outfile, args.jobs
         )
+        failed = [job for job in segment_jobs if job.error is not None]
+        seconds = sorted(job.seconds for job in segment_jobs)
+        if seconds:
+            print(
+                f"encoded {len(segment_jobs) - len(failed)}/{len(segment_jobs)}"
+                f" segments, {sum(seconds):.1f}s of encoding,"
+                f" median {seconds[len(seconds) // 2]:.1f}s, slowest {seconds[-1]:.1f}s"
+            )
+        for job in failed:
+            print(f"[warn] no card for {job.id_anki_card}")
     else:
         ankicards.segments_to_frame_cards(
-            args.video_path, args.video_ini_path, args.infile, args.outfile
+            args.video_path,
+            args.video_ini_path,
+            args.infile,
+            args.outfile,
+            args.thumbnails,
+            args.media_store,
+            mediastore.MediaStoreSettings(
+                args.frame_height, args.frame_format, args.frame_quality
+            ),
         )
 
     print("done!")
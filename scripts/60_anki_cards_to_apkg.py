@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import argparse
+from pathlib import Path
+
+from anki import apkg
+from easy_languages_anki import config
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="package cards csvs and their media into an .apkg to import into"
+        " anki"
+    )
+    parser.add_argument("apkg_path", type=Path, help="path to the .apkg to write")
+    parser.add_argument(
+        "cards_csvs", type=Path, nargs="+", help="cards csvs, of any number of videos"
+    )
+    parser.add_argument(
+        "--deck",
+        type=str,
+        default=config.APKG_DECK_NAME_DEFAULT,
+        help=config.APKG_DECK_NAME_HELP,
+    )
+    parser.add_argument(
+        "--media-dir",
+        type=Path,
+        action="append",
+        default=[],
+        help=config.APKG_MEDIA_DIRS_HELP,
+    )
+    args = parser.parse_args()
+
+    notes = 0
+    with apkg.apkg_writer(args.apkg_path, args.deck) as writer:
+        for cards_csv in args.cards_csvs:
+            notes_added = writer.cards_add(
+                apkg.cards_from_csv(cards_csv), [cards_csv.parent, *args.media_dir]
+            )
+            print(f"{cards_csv}: {notes_added} notes")
+            notes += notes_added
+    print(
+        f"wrote {notes} notes and {len(writer.media)} media files to {args.apkg_path}"
+    )
@@ -25,7 +25,7 @@ main() {
   local search_dir dest_dir
   search_dir="${1:?missing \`search_dir\`}"
   dest_dir="${2:?missing \`dest_dir\`}"
-  /bin/find "$search_dir" -type f \( -name '*.aac' -o -name '*.jpg' \) -exec cp -t "$dest_dir" {} +
+  /bin/find "$search_dir" -type f \( -name '*.aac' -o -name '*.jpg' -o -name '*.webp' -o -name '*.avif' \) -exec cp -t "$dest_dir" {} +
 }
 
 main "$@"
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+from pipeline import pipeline_arguments_add, pipeline_from_args, pipeline_video
+
+from easy_languages_anki import buildgraph, config
+
+
+class VideoResult(NamedTuple):
+    video: str
+    seconds: float
+    stages_ran: list[str]
+    error: str | None
+
+
+# the slots shared by all the worker processes, set when each one starts
+SLOTS: buildgraph.Slots = {}
+
+
+def worker_init(slots: buildgraph.Slots) -> None:
+    SLOTS.update(slots)
+
+
+@contextmanager
+def output_to(path: Path) -> Iterator[None]:
+    # by file descriptor, so ffmpeg and segmentize's processes write there too
+    sys.stdout.flush()
+    sys.stderr.flush()
+    stdout, stderr = os.dup(1), os.dup(2)
+    with open(path, "a") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            yield
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(stdout, 1)
+            os.dup2(stderr, 2)
+            os.close(stdout)
+            os.close(stderr)
+
+
+def video_run(video: str, args: argparse.Namespace) -> VideoResult:
+    video_id, _ = pipeline_video(video)
+    log_path = args.out_dir / video_id / "pipeline.log"
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.profile is not None:
+        # each video's own, videos segmentized at once would write over one report
+        args = argparse.Namespace(
+            **{**vars(args), "profile": str(log_path.parent / Path(args.profile).name)}
+        )
+
+    time_start = time.perf_counter()
+    stages_ran, error = [], None
+    with output_to(log_path):
+        try:
+            stages_ran = pipeline_from_args(video, args, SLOTS)
+        except Exception as e:
+            # one video failing doesn't stop the others
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+    return VideoResult(video, time.perf_counter() - time_start, stages_ran, error)
+
+
+def videos_read(videos_file: Path) -> list[str]:
+    with open(videos_file) as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def results_print(results: list[VideoResult]) -> None:
+    width = max(len("video"), *(len(result.video) for result in results))
+    print(f"{'video':<{width}}  {'status':<6}  {'seconds':>8}  ran")
+    for video, seconds, stages_ran, error in results:
+        status = "ok" if error is None else "failed"
+        ran = ", ".join(stages_ran) if stages_ran else "-"
+        print(f"{video:<{width}}  {status:<6}  {seconds:8.1f}  {ran}")
+        if error is not None:
+            print(f"{'':<{width}}  {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="`pipeline.py` for many videos at once, logging each one to"
+        " `pipeline.log` in its directory, where its `--profile` is written too"
+    )
+    parser.add_argument(
+        "videos_file",
+        type=Path,
+        help="file with a youtube id or path to a video file per line",
+    )
+    pipeline_arguments_add(parser)
+    parser.add_argument(
+        "--cpu-slots", type=int, default=None, help=config.BATCH_CPU_SLOTS_HELP
+    )
+    parser.add_argument(
+        "--ffmpeg-slots",
+        type=int,
+        default=config.BATCH_FFMPEG_SLOTS_DEFAULT,
+        help=config.BATCH_FFMPEG_SLOTS_HELP,
+    )
+    parser.add_argument(
+        "--download-slots",
+        type=int,
+        default=config.BATCH_DOWNLOAD_SLOTS_DEFAULT,
+        help=config.BATCH_DOWNLOAD_SLOTS_HELP,
+    )
+    parser.add_argument(
+        "--videos", type=int, default=None, help=config.BATCH_VIDEOS_HELP
+    )
+    args = parser.parse_args()
+
+    cpu_slots = args.cpu_slots or max(
+        1, (os.cpu_count() or 1) // (args.workers * args.ocr_workers)
+    )
+    slots: buildgraph.Slots = {
+        "cpu": multiprocessing.BoundedSemaphore(cpu_slots),
+        "ffmpeg": multiprocessing.BoundedSemaphore(args.ffmpeg_slots),
+        "download": multiprocessing.BoundedSemaphore(args.download_slots),
+    }
+    videos = videos_read(args.videos_file)
+    processes = args.videos or cpu_slots + args.ffmpeg_slots + args.download_slots
+    print(
+        f"{len(videos)} videos, {processes} at once, {cpu_slots} segmentizing,"
+        f" {args.ffmpeg_slots} cutting media, {args.download_slots} downloading"
+    )
+
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(videos) or 1),
+        initializer=worker_init,
+        initargs=(slots,),
+    ) as executor:
+        futures = {executor.submit(video_run, video, args): video for video in videos}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                # the process working on it died
+                result = VideoResult(
+                    futures[future], 0.0, [], f"{type(e).__name__}: {e}"
+                )
+            print(
+                f"{result.video}: {'ok' if result.error is None else 'failed'}"
+                f" after {result.seconds:.1f}s"
+            )
+            results.append(result)
+
+    results_print(sorted(results, key=lambda result: videos.index(result.video)))
+    if any(result.error is not None for result in results):
+        sys.exit(1)
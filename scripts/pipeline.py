@@ -1,29 +1,65 @@
 #!/usr/bin/env python3
 import argparse
-from enum import IntEnum, unique
+import os
+import tempfile
 from pathlib import Path
 
-from easy_languages_anki import ankicards, config, segmentcleaner, segmentize, videodl
+from easy_languages_anki import (
+    ankicards,
+    buildgraph,
+    changedetect,
+    checkpoint,
+    config,
+    framesource,
+    imagetotext,
+    mediastore,
+    segmentcleaner,
+    segmentize,
+    streaming,
+    subtitlelayout,
+    thumbnails,
+    videodl,
+)
 
 
-def pipeline_video_download(video_id: str, video_out_dir: Path):
-    video_path, video_ini_path = videodl.download_youtube(video_id, video_out_dir)
-    return video_path, video_ini_path
+def pipeline_video_download(video_id: str, video_path: Path, video_ini_path: Path):
+    # downloaded to the side, so a download that's cut off isn't taken for the video
+    with tempfile.TemporaryDirectory(dir=video_path.parent) as download_dir:
+        video_path_downloaded, video_ini_path_downloaded = videodl.download_youtube(
+            video_id, Path(download_dir)
+        )
+        os.replace(video_path_downloaded, video_path)
+        os.replace(video_ini_path_downloaded, video_ini_path)
+
+
+def pipeline_video_local(video_file: Path, video_path: Path, video_ini_path: Path):
+    # linked rather than copied, videos are big
+    video_path.symlink_to(video_file.resolve())
+    videodl.video_ini_write(
+        video_ini_path,
+        {
+            "url": video_file.resolve().as_uri(),
+            "id": video_file.stem,
+            "title": video_file.stem,
+        },
+    )
 
 
 def pieline_segmentize(
     video_path: Path,
     lang: str,
     segments_raw_text_file: Path,
-    caption_video_similarity_cutoff: float,
-    caption_text_similarity_cutoff: float,
+    segmentize_settings: segmentize.SegmentizeSettings,
+    resume: bool,
+    segment_sink: streaming.SegmentSink | None = None,
 ):
     segmentize.segmentize(
         str(video_path),
         lang,
         str(segments_raw_text_file),
-        caption_video_similarity_cutoff,
-        caption_text_similarity_cutoff,
+        segmentize_settings,
+        resume,
+        segment_sink,
     )
 
 
@@ -36,93 +72,207 @@ def video_generate_anki_cards(
     video_ini_path: Path,
     segments_cleaned_file: Path,
     ankicards_file: Path,
+    thumbnails_dir: Path | None,
+    media_store_path: str | None,
+    media_store_settings: mediastore.MediaStoreSettings,
 ):
     ankicards.segments_to_frame_cards(
         str(video_path),
         str(video_ini_path),
         str(segments_cleaned_file),
         str(ankicards_file),
+        None if thumbnails_dir is None else str(thumbnails_dir),
+        media_store_path,
+        media_store_settings,
     )
 
 
-@unique
-class PipelineStage(IntEnum):
-    VIDEO_DOWNLOAD = 1
-    SEGMENTIZE = 2
-    SEGMENTS_CLEAN = 3
-    ANKI_CARDS = 4
-    DONE = 5
-
-
 def pipeline(
     video_id: str,
     out_dir: Path,
     lang: str,
-    caption_video_similarity_cutoff: float,
-    caption_text_similarity_cutoff: float,
-):
+    segmentize_settings: segmentize.SegmentizeSettings,
+    media_store_path: str | None,
+    media_store_settings: mediastore.MediaStoreSettings,
+    stream: bool,
+    video_file: Path | None = None,
+    slots: buildgraph.Slots | None = None,
+) -> list[str]:
     # easy-languages videos are always captioned in the target language and english
     lang = f"{lang}+eng"
 
     workdir = out_dir / video_id
-    video_out_dir = workdir
+    video_path = workdir / (
+        f"{video_id}.mp4" if video_file is None else f"{video_id}{video_file.suffix}"
+    )
+    video_ini_path = workdir / f"{video_id}.ini"
     segments_raw_text_file = workdir / "pipeline_20_segments_raw.csv"
     segments_cleaned_file = workdir / "pipeline_40_segments_cleaned.csv"
     ankicards_file = workdir / "pipeline_50_ankicards.csv"
+    thumbnails_dir = thumbnails.thumbnails_path(str(segments_raw_text_file))
+    thumbnails_keep = segmentize_settings.thumbnails
 
     workdir.mkdir(parents=True, exist_ok=True)
 
-    stage = PipelineStage.VIDEO_DOWNLOAD
-    video_path = video_out_dir / f"{video_id}.mp4"
-    video_ini_path = video_out_dir / f"{video_id}.ini"
-    if video_path.exists() and video_ini_path.exists():
-        if segments_raw_text_file.exists():
-            if segments_cleaned_file.exists():
-                if ankicards_file.exists():
-                    stage = PipelineStage.DONE
-                else:
-                    stage = PipelineStage.ANKI_CARDS
-            else:
-                stage = PipelineStage.SEGMENTS_CLEAN
-        else:
-            stage = PipelineStage.SEGMENTIZE
+    def segmentize_run(
+        outputs: list[Path], segment_sink: streaming.SegmentSink | None = None
+    ):
+        # segmentize picks up where an interrupted run left its partial output
+        pieline_segmentize(
+            video_path,
+            lang,
+            outputs[0],
+            segmentize_settings,
+            outputs[0].exists(),
+            segment_sink,
+        )
+        checkpoint.checkpoint_path(str(outputs[0])).unlink(missing_ok=True)
+        if thumbnails_keep:
+            # none are kept with a frame source that can't
+            outputs[1].mkdir(exist_ok=True)
 
-    print(f"video_id: {video_id}")
-    print(f"starting from stage: {stage.name}")
-
-    while stage != PipelineStage.DONE:
-        if stage == PipelineStage.VIDEO_DOWNLOAD:
-            video_path, video_ini_path = pipeline_video_download(
-                video_id, video_out_dir
-            )
-        elif stage == PipelineStage.SEGMENTIZE:
-            print(f"segmentizing video {video_path}")
-            pieline_segmentize(
-                video_path,
-                lang,
-                segments_raw_text_file,
-                caption_video_similarity_cutoff,
-                caption_text_similarity_cutoff,
-            )
-        elif stage == PipelineStage.SEGMENTS_CLEAN:
-            print("cleaning segments")
-            pipeline_clean_segments(segments_raw_text_file, segments_cleaned_file)
-        elif stage == PipelineStage.ANKI_CARDS:
-            print("generating anki cards")
-            video_generate_anki_cards(
-                video_path, video_ini_path, segments_cleaned_file, ankicards_file
-            )
-        else:
-            raise ValueError(f"unknown stage: {stage}")
-
-        stage = stage + 1
+    def segmentize_streamed_run(outputs: list[Path]):
+        segments_raw_text_partial, segments_cleaned_partial, ankicards_partial = (
+            outputs[:3]
+        )
+        streaming.segmentize_streamed_to_frame_cards(
+            lambda segment_sink: segmentize_run(
+                [segments_raw_text_partial, *outputs[3:]], segment_sink
+            ),
+            str(video_path),
+            str(video_ini_path),
+            str(segments_raw_text_partial),
+            str(segments_cleaned_partial),
+            str(ankicards_partial),
+            str(outputs[3]) if thumbnails_keep else None,
+            media_store_path,
+            media_store_settings,
+        )
+
+    def segmentize_adopt() -> bool:
+        # output without a checkpoint next to it is from before there were stages
+        return segments_raw_text_file.exists() and checkpoint.segmentize_complete(
+            str(segments_raw_text_file)
+        )
 
+    video_stage = (
+        buildgraph.Stage(
+            "video_download",
+            (),
+            (video_path, video_ini_path),
+            {"video_id": video_id},
+            # downloading it again would get the same video
+            (),
+            lambda outputs: pipeline_video_download(video_id, *outputs),
+            lambda: video_path.exists() and video_ini_path.exists(),
+            ("download",),
+        )
+        if video_file is None
+        else buildgraph.Stage(
+            "video_local",
+            (video_file,),
+            (video_path, video_ini_path),
+            {"video_file": str(video_file.resolve())},
+            (),
+            lambda outputs: pipeline_video_local(video_file, *outputs),
+        )
+    )
+    segmentize_params = {
+        "lang": lang,
+        "caption_video_similarity_cutoff": (
+            segmentize_settings.caption_video_similarity_cutoff
+        ),
+        "caption_text_similarity_cutoff": (
+            segmentize_settings.caption_text_similarity_cutoff
+        ),
+        "frame_source": segmentize_settings.frame_source,
+        "change_detector": segmentize_settings.change_detector,
+        "frame_stride": segmentize_settings.frame_stride,
+        "ocr_engine": segmentize_settings.ocr_engine,
+        "subtitle_layout": segmentize_settings.subtitle_layout,
+        "layout_profiles_path": segmentize_settings.layout_profiles,
+        "thumbnails": thumbnails_keep,
+    }
+    anki_cards_params = {
+        "media_store_path": media_store_path,
+        "media_store_settings": media_store_settings,
+    }
+    thumbnails_outputs = (thumbnails_dir,) if thumbnails_keep else ()
+    if stream:
+        # the cleaned segments and cards are made as segmentize finds the segments
+        stages = [
+            video_stage,
+            buildgraph.Stage(
+                "segmentize_streamed",
+                (video_path, video_ini_path),
+                (
+                    segments_raw_text_file,
+                    segments_cleaned_file,
+                    ankicards_file,
+                    *thumbnails_outputs,
+                ),
+                {**segmentize_params, **anki_cards_params},
+                (segmentize, streaming),
+                segmentize_streamed_run,
+                # cuts the media of cards as it goes, so it takes an ffmpeg slot too
+                resources=("cpu", "ffmpeg"),
+            ),
+        ]
+    else:
+        stages = [
+            video_stage,
+            buildgraph.Stage(
+                "segmentize",
+                (video_path,),
+                (segments_raw_text_file, *thumbnails_outputs),
+                segmentize_params,
+                (segmentize,),
+                segmentize_run,
+                segmentize_adopt,
+                ("cpu",),
+            ),
+            buildgraph.Stage(
+                "segments_clean",
+                (segments_raw_text_file,),
+                (segments_cleaned_file,),
+                {},
+                (segmentcleaner,),
+                lambda outputs: pipeline_clean_segments(
+                    segments_raw_text_file, outputs[0]
+                ),
+            ),
+            buildgraph.Stage(
+                "anki_cards",
+                (
+                    video_path,
+                    video_ini_path,
+                    segments_cleaned_file,
+                    *thumbnails_outputs,
+                ),
+                (ankicards_file,),
+                anki_cards_params,
+                (ankicards,),
+                lambda outputs: video_generate_anki_cards(
+                    video_path,
+                    video_ini_path,
+                    segments_cleaned_file,
+                    outputs[0],
+                    thumbnails_dir if thumbnails_keep else None,
+                    media_store_path,
+                    media_store_settings,
+                ),
+                resources=("ffmpeg",),
+            ),
+        ]
+
+    print(f"video_id: {video_id}")
+    stages_ran = buildgraph.stages_run(stages, workdir / "pipeline_stages.json", slots)
+    print(f"ran {', '.join(stages_ran) if stages_ran else 'nothing'}")
     print("done!")
+    return stages_ran
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("video_id", type=Path, help="id of youtube video")
+def pipeline_arguments_add(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("out_dir", type=Path)
     parser.add_argument("lang", type=str)
     parser.add_argument(
@@ -137,12 +287,181 @@ if __name__ == "__main__":
         default=config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT,
         help=config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_HELP,
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--frame-source",
+        type=str,
+        choices=framesource.FRAME_SOURCES,
+        default=config.SEGMENTIZE_FRAME_SOURCE_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_SOURCE_HELP,
+    )
+    parser.add_argument(
+        "--change-detector",
+        type=str,
+        choices=changedetect.CHANGE_DETECTORS,
+        default=config.SEGMENTIZE_CHANGE_DETECTOR_DEFAULT,
+        help=config.SEGMENTIZE_CHANGE_DETECTOR_HELP,
+    )
+    parser.add_argument(
+        "--frame-stride",
+        type=int,
+        default=config.SEGMENTIZE_FRAME_STRIDE_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_STRIDE_HELP,
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.SEGMENTIZE_WORKERS_DEFAULT,
+        help=config.SEGMENTIZE_WORKERS_HELP,
+    )
+    parser.add_argument(
+        "--ocr-engine",
+        type=str,
+        choices=imagetotext.OCR_ENGINES,
+        default=config.SEGMENTIZE_OCR_ENGINE_DEFAULT,
+        help=config.SEGMENTIZE_OCR_ENGINE_HELP,
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=config.SEGMENTIZE_OCR_WORKERS_DEFAULT,
+        help=config.SEGMENTIZE_OCR_WORKERS_HELP,
+    )
+    parser.add_argument(
+        "--ocr-cache",
+        type=str,
+        default=config.SEGMENTIZE_OCR_CACHE_DEFAULT,
+        help=config.SEGMENTIZE_OCR_CACHE_HELP,
+    )
+    parser.add_argument(
+        "--no-ocr-cache",
+        dest="ocr_cache",
+        action="store_const",
+        const=None,
+        help="don't cache ocr results",
+    )
+    parser.add_argument(
+        "--ocr-cache-max-entries",
+        type=int,
+        default=config.SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_DEFAULT,
+        help=config.SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_HELP,
+    )
+    parser.add_argument(
+        "--subtitle-layout",
+        type=str,
+        choices=subtitlelayout.SUBTITLE_LAYOUTS,
+        default=config.SEGMENTIZE_SUBTITLE_LAYOUT_DEFAULT,
+        help=config.SEGMENTIZE_SUBTITLE_LAYOUT_HELP,
+    )
+    parser.add_argument(
+        "--subtitle-layout-profiles",
+        type=str,
+        default=config.SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_DEFAULT,
+        help=config.SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_HELP,
+    )
+    parser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=config.SEGMENTIZE_CHECKPOINT_EVERY_DEFAULT,
+        help=config.SEGMENTIZE_CHECKPOINT_EVERY_HELP,
+    )
+    parser.add_argument(
+        "--frame-prefetch",
+        type=int,
+        default=config.SEGMENTIZE_FRAME_PREFETCH_DEFAULT,
+        help=config.SEGMENTIZE_FRAME_PREFETCH_HELP,
+    )
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help=config.SEGMENTIZE_PROFILE_HELP,
+    )
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help=config.SEGMENTIZE_THUMBNAILS_HELP,
+    )
+    parser.add_argument(
+        "--media-store",
+        type=str,
+        default=config.ANKICARDS_MEDIA_STORE_DEFAULT,
+        help=config.ANKICARDS_MEDIA_STORE_HELP,
+    )
+    parser.add_argument(
+        "--frame-height",
+        type=int,
+        default=config.ANKICARDS_FRAME_HEIGHT_DEFAULT,
+        help=config.ANKICARDS_FRAME_HEIGHT_HELP,
+    )
+    parser.add_argument(
+        "--frame-format",
+        type=str,
+        choices=mediastore.FRAME_FORMATS,
+        default=config.ANKICARDS_FRAME_FORMAT_DEFAULT,
+        help=config.ANKICARDS_FRAME_FORMAT_HELP,
+    )
+    parser.add_argument(
+        "--frame-quality",
+        type=int,
+        default=config.ANKICARDS_FRAME_QUALITY_DEFAULT,
+        help=config.ANKICARDS_FRAME_QUALITY_HELP,
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=config.PIPELINE_STREAM_HELP,
+    )
+
+
+def pipeline_video(video: str) -> tuple[str, Path | None]:
+    # a video file on disk is used as it is, anything else is a youtube id
+    if Path(video).is_file():
+        return Path(video).stem, Path(video)
+    return video, None
+
 
-    pipeline(
-        args.video_id,
+def pipeline_from_args(
+    video: str, args: argparse.Namespace, slots: buildgraph.Slots | None = None
+) -> list[str]:
+    video_id, video_file = pipeline_video(video)
+    return pipeline(
+        video_id,
         args.out_dir,
         args.lang,
-        args.caption_video_similarity_cutoff,
-        args.caption_text_similarity_cutoff,
+        segmentize.SegmentizeSettings(
+            args.caption_video_similarity_cutoff,
+            args.caption_text_similarity_cutoff,
+            args.frame_source,
+            args.change_detector,
+            args.frame_stride,
+            args.workers,
+            args.ocr_engine,
+            args.ocr_workers,
+            args.ocr_cache,
+            args.ocr_cache_max_entries,
+            args.subtitle_layout,
+            args.subtitle_layout_profiles,
+            args.checkpoint_every,
+            args.frame_prefetch,
+            args.profile,
+            args.thumbnails,
+        ),
+        args.media_store,
+        mediastore.MediaStoreSettings(
+            args.frame_height, args.frame_format, args.frame_quality
+        ),
+        args.stream,
+        video_file,
+        slots,
     )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "video_id", type=str, help="id of youtube video, or path to a video file"
+    )
+    pipeline_arguments_add(parser)
+    args = parser.parse_args()
+
+    pipeline_from_args(args.video_id, args)
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import anki
 from anki.parser import AnkiNoteEasyLanguages
-from easy_languages_anki import segment
+from easy_languages_anki import config, segment
 from vocab import expander, vocab
 
 
@@ -27,12 +27,17 @@ def main(
     outfile_prefix: str,
     notes_csv_skip: Path | None,
     known_vocab_list: Path | None,
+    nlp_settings: vocab.NlpSettings,
+    batch_size: int,
+    n_process: int,
 ):
     notes_anki = list(
         anki.parser.notes_from_notes_txt(AnkiNoteEasyLanguages, notes_csv_anki_export)
     )
 
-    vocab_known = vocab.from_strings(note.target for note in notes_anki)
+    vocab_known = vocab.from_strings(
+        (note.target for note in notes_anki), nlp_settings, batch_size, n_process
+    )
 
     if known_vocab_list:
         vocab_know_manual = _file_to_vocab(known_vocab_list)
@@ -60,7 +65,7 @@ def main(
         )
 
     expand_diff = expander.ankicards_diff_from_known_vocab(
-        vocab_known, notes_easy_language
+        vocab_known, notes_easy_language, nlp_settings, batch_size, n_process
     )
 
     for expansion_num in range(num_expansions):
@@ -106,6 +111,31 @@ if __name__ == "__main__":
         default="expander-cards",
         help="outfile name: `{prefix}-{expansion}.csv` (default 'expander-cards')",
     )
+    parser.add_argument(
+        "--spacy-model",
+        type=str,
+        default=config.VOCAB_SPACY_MODEL_DEFAULT,
+        help=config.VOCAB_SPACY_MODEL_HELP,
+    )
+    parser.add_argument(
+        "--spacy-exclude",
+        type=str,
+        nargs="*",
+        default=list(config.VOCAB_SPACY_EXCLUDE_DEFAULT),
+        help=config.VOCAB_SPACY_EXCLUDE_HELP,
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=config.VOCAB_BATCH_SIZE_DEFAULT,
+        help=config.VOCAB_BATCH_SIZE_HELP,
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=config.VOCAB_PROCESSES_DEFAULT,
+        help=config.VOCAB_PROCESSES_HELP,
+    )
     args = parser.parse_args()
 
     main(
@@ -115,4 +145,7 @@ if __name__ == "__main__":
         args.outfile_prefix,
         args.skip_notes,
         args.known_vocab_list,
+        vocab.NlpSettings(args.spacy_model, tuple(args.spacy_exclude)),
+        args.batch_size,
+        args.processes,
     )
@@ -0,0 +1,415 @@
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+import zipfile
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from easy_languages_anki.segment import AnkiVideoFrameCard, AnkiVideoFullCard
+
+# the legacy collection schema, every anki version imports it
+APKG_SCHEMA = """
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null,
+    tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE graves (
+    usn integer not null, oid integer not null, type integer not null
+);
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+"""
+SCHEMA_VERSION = 11
+
+FIELD_SEPARATOR = "\x1f"
+
+# note types and the deck keep their ids, so importing another package updates the
+# notes an earlier one made instead of adding a second note type
+DECK_ID = 1718000000000
+
+NOTE_TYPE_STANDARD = 0
+NOTE_TYPE_CLOZE = 1
+
+DECK_CONFIG = {
+    "id": 1,
+    "name": "Default",
+    "mod": 0,
+    "usn": 0,
+    "maxTaken": 60,
+    "autoplay": True,
+    "replayq": True,
+    "timer": 0,
+    "new": {
+        "bury": True,
+        "delays": [1, 10],
+        "initialFactor": 2500,
+        "ints": [1, 4, 7],
+        "order": 1,
+        "perDay": 20,
+        "separate": True,
+    },
+    "rev": {
+        "bury": True,
+        "ease4": 1.3,
+        "fuzz": 0.05,
+        "ivlFct": 1,
+        "maxIvl": 36500,
+        "minSpace": 1,
+        "perDay": 100,
+    },
+    "lapse": {
+        "delays": [10],
+        "leechAction": 0,
+        "leechFails": 8,
+        "minInt": 1,
+        "mult": 0,
+    },
+}
+
+COLLECTION_CONFIG = {
+    "activeDecks": [1],
+    "curDeck": 1,
+    "newSpread": 0,
+    "collapseTime": 1200,
+    "timeLim": 0,
+    "estTimes": True,
+    "dueCounts": True,
+    "curModel": None,
+    "nextPos": 1,
+    "sortType": "noteFld",
+    "sortBackwards": False,
+    "addToCur": True,
+}
+
+
+class ApkgNoteType(NamedTuple):
+    id: int
+    name: str
+    type: int
+    fields: tuple[str, ...]
+    # `(name, front, back)`
+    templates: tuple[tuple[str, str, str], ...]
+
+
+NOTE_TYPE_VIDEO_FRAME = ApkgNoteType(
+    1718000000001,
+    "easy-languages video frame",
+    NOTE_TYPE_STANDARD,
+    tuple(field for field in AnkiVideoFrameCard._fields if field != "tags"),
+    (
+        (
+            "listen",
+            "{{frame}}<br>{{audio}}",
+            "{{FrontSide}}<hr id=answer>{{learning}}<br>{{english}}<br>"
+            '<a href="{{video_url}}">{{video_title}}</a>',
+        ),
+    ),
+)
+
+NOTE_TYPE_VIDEO_FULL = ApkgNoteType(
+    1718000000002,
+    "easy-languages video full",
+    NOTE_TYPE_CLOZE,
+    tuple(field for field in AnkiVideoFullCard._fields if field != "tags"),
+    (
+        (
+            "cloze",
+            "{{cloze:cloze_listen_hack}}{{video_media_anchor}}",
+            "{{cloze:cloze_listen_hack}}{{video_media_anchor}}<br>{{learning}}<br>"
+            '{{english}}<br><a href="{{video_url}}">{{video_title}}</a>',
+        ),
+    ),
+)
+
+AnkiCard = AnkiVideoFrameCard | AnkiVideoFullCard
+
+
+def note_type_json(note_type: ApkgNoteType, mod: int) -> dict[str, Any]:
+    return {
+        "id": note_type.id,
+        "name": note_type.name,
+        "type": note_type.type,
+        "mod": mod,
+        "usn": -1,
+        "sortf": 0,
+        "did": DECK_ID,
+        "flds": [
+            {
+                "name": field,
+                "ord": ord_,
+                "sticky": False,
+                "rtl": False,
+                "font": "Arial",
+                "size": 20,
+                "media": [],
+            }
+            for ord_, field in enumerate(note_type.fields)
+        ],
+        "tmpls": [
+            {
+                "name": name,
+                "ord": ord_,
+                "qfmt": front,
+                "afmt": back,
+                "did": None,
+                "bqfmt": "",
+                "bafmt": "",
+            }
+            for ord_, (name, front, back) in enumerate(note_type.templates)
+        ],
+        "css": ".card { font-family: arial; font-size: 20px; text-align: center; }",
+        "latexPre": "",
+        "latexPost": "",
+        "latexsvg": False,
+        "req": [[0, "any", [0]]],
+        "tags": [],
+        "vers": [],
+    }
+
+
+def deck_json(deck_id: int, name: str, mod: int) -> dict[str, Any]:
+    return {
+        "id": deck_id,
+        "name": name,
+        "mod": mod,
+        "usn": -1,
+        "desc": "",
+        "dyn": 0,
+        "conf": 1,
+        "collapsed": False,
+        "browserCollapsed": False,
+        "extendNew": 0,
+        "extendRev": 0,
+        "newToday": [0, 0],
+        "revToday": [0, 0],
+        "lrnToday": [0, 0],
+        "timeToday": [0, 0],
+    }
+
+
+def field_checksum(field: str) -> int:
+    return int(hashlib.sha1(field.encode()).hexdigest()[:8], 16)
+
+
+def card_note_type(card: AnkiCard) -> ApkgNoteType:
+    if isinstance(card, AnkiVideoFrameCard):
+        return NOTE_TYPE_VIDEO_FRAME
+    return NOTE_TYPE_VIDEO_FULL
+
+
+def card_fields(card: AnkiCard) -> list[str]:
+    if isinstance(card, AnkiVideoFrameCard):
+        # media is only found and shipped with the note when it's tagged in a field
+        card = card._replace(
+            audio=f"[sound:{card.audio}]", frame=f'<img src="{card.frame}">'
+        )
+    return [getattr(card, field) for field in card_note_type(card).fields]
+
+
+def card_media(card: AnkiCard) -> list[str]:
+    if isinstance(card, AnkiVideoFrameCard):
+        return [card.audio, card.frame]
+    return [card.video]
+
+
+def cards_from_csv(csv_path: Path) -> Iterator[AnkiCard]:
+    # either kind of cards csv, told apart by its header
+    with open(csv_path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        card_type = next(
+            (
+                card_type
+                for card_type in (AnkiVideoFrameCard, AnkiVideoFullCard)
+                if header == [*card_type._fields]
+            ),
+            None,
+        )
+        if card_type is None:
+            raise ValueError(f"{csv_path} is not a cards csv, its header is {header}")
+        yield from map(card_type._make, reader)
+
+
+class ApkgWriter:
+    # notes go into a collection on disk in one transaction and media straight into
+    # the zip, so only the names of what's been written are kept in memory
+
+    def __init__(self, apkg_path: Path, deck_name: str, tmp_dir: Path):
+        self.apkg_path = apkg_path
+        self.deck_name = deck_name
+        self.collection_path = tmp_dir / "collection.anki2"
+        self.db = sqlite3.connect(self.collection_path, isolation_level=None)
+        # thrown away if writing fails, so no need to be able to recover it
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.executescript(APKG_SCHEMA)
+        self.db.execute("BEGIN")
+
+        self.apkg_path_tmp = apkg_path.with_name(f"{apkg_path.name}.{os.getpid()}.tmp")
+        self.apkg = zipfile.ZipFile(self.apkg_path_tmp, "w")
+        # media name to its number in the zip
+        self.media: dict[str, int] = {}
+        self.guids: set[str] = set()
+        self.note_types: set[ApkgNoteType] = set()
+        # ids are milliseconds, one apart for every note so they don't collide
+        self.id_next = int(time.time() * 1000)
+
+    def media_add(self, name: str, media_dirs: list[Path]) -> bool:
+        if name in self.media:
+            return True
+        path = next(
+            (
+                media_dir / name
+                for media_dir in media_dirs
+                if (media_dir / name).exists()
+            ),
+            None,
+        )
+        if path is None:
+            return False
+        # audio and images are compressed already
+        self.apkg.write(path, str(len(self.media)), compress_type=zipfile.ZIP_STORED)
+        self.media[name] = len(self.media)
+        return True
+
+    def cards_add(self, cards: Iterable[AnkiCard], media_dirs: list[Path]) -> int:
+        mod = int(time.time())
+        notes, notes_cards = [], []
+        for card in cards:
+            # a card already written by an earlier csv
+            if card.id_anki_card in self.guids:
+                continue
+            media_missing = [
+                name
+                for name in card_media(card)
+                if not self.media_add(name, media_dirs)
+            ]
+            if media_missing:
+                print(f"[warn] no {', '.join(media_missing)} for {card.id_anki_card}")
+                continue
+            self.guids.add(card.id_anki_card)
+
+            note_type = card_note_type(card)
+            self.note_types.add(note_type)
+            fields = card_fields(card)
+            note_id = self.id_next
+            self.id_next += 1
+            notes.append(
+                (
+                    note_id,
+                    card.id_anki_card,
+                    note_type.id,
+                    mod,
+                    -1,
+                    f" {card.tags} " if card.tags else "",
+                    FIELD_SEPARATOR.join(fields),
+                    fields[0],
+                    field_checksum(fields[0]),
+                    0,
+                    "",
+                )
+            )
+            # new cards are shown in the order they're added
+            notes_cards.append(
+                (note_id, note_id, DECK_ID, 0, mod, -1, 0, 0, len(self.guids))
+                + (0,) * 8
+                + ("",)
+            )
+        self.db.executemany(
+            "INSERT INTO notes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", notes
+        )
+        self.db.executemany(
+            "INSERT INTO cards VALUES"
+            " (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            notes_cards,
+        )
+        return len(notes)
+
+    def close(self) -> None:
+        now = int(time.time())
+        models = {
+            str(note_type.id): note_type_json(note_type, now)
+            for note_type in self.note_types
+        }
+        decks = {
+            "1": deck_json(1, "Default", now),
+            str(DECK_ID): deck_json(DECK_ID, self.deck_name, now),
+        }
+        self.db.execute(
+            "INSERT INTO col VALUES (1, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?, ?, '{}')",
+            (
+                now,
+                now * 1000,
+                now * 1000,
+                SCHEMA_VERSION,
+                json.dumps(COLLECTION_CONFIG),
+                json.dumps(models),
+                json.dumps(decks),
+                json.dumps({"1": DECK_CONFIG}),
+            ),
+        )
+        self.db.execute("COMMIT")
+        self.db.close()
+
+        self.apkg.write(
+            self.collection_path,
+            "collection.anki2",
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+        self.apkg.writestr(
+            "media",
+            json.dumps({str(i): name for name, i in self.media.items()}),
+            compress_type=zipfile.ZIP_DEFLATED,
+        )
+        self.apkg.close()
+        os.replace(self.apkg_path_tmp, self.apkg_path)
+
+    def abort(self) -> None:
+        self.db.close()
+        self.apkg.close()
+        self.apkg_path_tmp.unlink(missing_ok=True)
+
+
+@contextmanager
+def apkg_writer(apkg_path: Path, deck_name: str) -> Iterator[ApkgWriter]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        writer = ApkgWriter(apkg_path, deck_name, Path(tmp_dir))
+        try:
+            yield writer
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
@@ -1,13 +1,38 @@
 import configparser
 import csv
 import os
+import shutil
 import subprocess
-from collections.abc import Iterable
+import time
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, NamedTuple
 
 import cv2
 from tqdm import tqdm
 
+from . import config
+from .framesource import Frame, video_size
+from .mediamanifest import (
+    file_sha256,
+    media_manifest_path,
+    media_manifest_read,
+    media_manifest_write,
+    media_orphans,
+    media_params,
+    media_record,
+    media_stale,
+    video_fingerprint,
+)
+from .mediastore import (
+    MEDIA_STORE_SETTINGS_DEFAULT,
+    MediaStore,
+    MediaStoreSettings,
+    media_store,
+)
 from .segment import (
     AnkiVideoFrameCard,
     AnkiVideoFrameCardReqs,
@@ -15,8 +40,24 @@ from .segment import (
     AnkiVideoFullCardReqs,
     Segment,
 )
+from .thumbnails import ThumbnailFiles, thumbnail_for_frame, thumbnails_read
 
 FPS = 30
+# clips cut by one `ffmpeg`, each one writes every packet it reads to all its outputs
+# so a few at a time is fastest
+AUDIO_CLIPS_PER_FFMPEG = 8
+# threads writing card frames while the next ones are decoded
+FRAME_WRITERS = 4
+
+# writes the decoded frame of the card with the id, in one of the writer threads
+FrameWrite = Callable[[str, Frame], Any]
+
+
+class SegmentJob(NamedTuple):
+    id_anki_card: str
+    seconds: float
+    # why the segment has no card
+    error: str | None
 
 
 @contextmanager
@@ -142,29 +183,113 @@ def segment_audio(
     return outfile_name
 
 
-def segment_frame(
-    video: cv2.VideoCapture,
-    frame_number: int,
-    video_path: str,
-    video_id: str,
-    segment_start_timestamp: float,
-    segment_end_timestamp: float,
-) -> str:
-    video.set(cv2.CAP_PROP_POS_FRAMES, frame_number - 1)
-    ret, image = video.read()
-
-    if not ret:
-        raise RuntimeError(f"could not read frame {frame_number}")
-
-    id_anki_card = id_anki_card_for_segment(
-        video_id, segment_start_timestamp, segment_end_timestamp
-    )
+def segments_audio(
+    video_path: str, clips: list[tuple[str, float, float]], progress: bool = True
+) -> list[str]:
+    # `segment_audio` for many `(id_anki_card, start, end)` clips at once. each
+    # `ffmpeg` seeks to its first clip and cuts the next few in the same pass, instead
+    # of every clip reading the video from the start
+    clips_sorted = sorted(clips, key=lambda clip: clip[1])
+    batches = [
+        clips_sorted[i : i + AUDIO_CLIPS_PER_FFMPEG]
+        for i in range(0, len(clips_sorted), AUDIO_CLIPS_PER_FFMPEG)
+    ]
+    for batch in tqdm(
+        batches, unit="batch", desc="audio", disable=not progress or not batches
+    ):
+        outputs: list[str] = []
+        for id_anki_card, segment_start_timestamp, segment_end_timestamp in batch:
+            outfile, _outfile_name = outfile_path_and_name(
+                video_path, id_anki_card, "aac"
+            )
+            outputs += [
+                "-ss",  # start
+                str(segment_start_timestamp),
+                "-to",  # to
+                str(segment_end_timestamp),
+                "-vn",  # no video
+                "-acodec",
+                "copy",  # copy audio without re-encoding
+                outfile,
+            ]
+
+        _, batch_start_timestamp, _ = batch[0]
+        _completed_process = subprocess.run(
+            [
+                "ffmpeg",
+                "-nostdin",
+                "-loglevel",
+                "error",
+                "-y",  # overwrite output files
+                "-ss",  # seek the input to the first clip
+                str(batch_start_timestamp),
+                "-copyts",  # keep the timestamps, so the clips are cut where they'd be
+                "-i",
+                video_path,
+                *outputs,
+            ],
+            check=True,
+        )
 
-    outfile, outfile_name = outfile_path_and_name(video_path, id_anki_card, "jpg")
+    return [
+        outfile_path_and_name(video_path, id_anki_card, "aac")[1]
+        for id_anki_card, _, _ in clips
+    ]
 
-    cv2.imwrite(outfile, image)
 
-    return outfile_name
+def segments_frames(
+    video: cv2.VideoCapture,
+    video_path: str,
+    frames: list[tuple[str, int]],
+    progress: bool = True,
+    frame_write: FrameWrite | None = None,
+) -> list[str]:
+    # the `(id_anki_card, frame_number)` frames in one pass forward through the video,
+    # only decoding the frames asked for, instead of seeking back to a keyframe and
+    # decoding from there for every one. goes on from wherever the video is at, so
+    # frames further on can be asked for in another call. frames are written as jpgs
+    # next to the video unless there's a `frame_write`.
+    ids_by_index: dict[int, list[str]] = {}
+    for id_anki_card, frame_number in frames:
+        ids_by_index.setdefault(max(frame_number - 1, 0), []).append(id_anki_card)
+
+    def frame_jpg_write(id_anki_card: str, image: Frame) -> bool:
+        outfile, _outfile_name = outfile_path_and_name(video_path, id_anki_card, "jpg")
+        return cv2.imwrite(outfile, image)
+
+    write = frame_jpg_write if frame_write is None else frame_write
+    writes: deque[Future[Any]] = deque()
+    with ThreadPoolExecutor(
+        max_workers=FRAME_WRITERS, thread_name_prefix="frame_write"
+    ) as executor:
+        index = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+        for index_frame in tqdm(
+            sorted(ids_by_index), unit="frame", disable=not progress
+        ):
+            if index_frame < index:
+                video.set(cv2.CAP_PROP_POS_FRAMES, index_frame)
+                index = index_frame
+            # frames in between are only grabbed, not decoded into an image
+            while index <= index_frame:
+                if not video.grab():
+                    raise RuntimeError(f"could not read frame {index_frame + 1}")
+                index += 1
+            ret, image = video.retrieve()
+            if not ret:
+                raise RuntimeError(f"could not read frame {index_frame + 1}")
+
+            for id_anki_card in ids_by_index[index_frame]:
+                writes.append(executor.submit(write, id_anki_card, image))
+            # don't keep more decoded frames around than the writers can keep up with
+            while len(writes) > 2 * FRAME_WRITERS:
+                writes.popleft().result()
+        for write in writes:
+            write.result()
+
+    return [
+        outfile_path_and_name(video_path, id_anki_card, "jpg")[1]
+        for id_anki_card, _ in frames
+    ]
 
 
 def segment_to_anki_video_full_card_reqs(
@@ -218,33 +343,63 @@ def anki_video_full_card_reqs_to_anki_video_full_cards(
     )
 
 
-def segment_to_anki_video_frame_card_reqs(
-    segment: Segment,
+def segment_clip(
+    segment: Segment, video_id: str, fps: float
+) -> tuple[str, float, float]:
+    start_frame_s, end_frame_s, _learning, _english = segment
+    start_timestamp, end_timestamp = int(start_frame_s) / fps, int(end_frame_s) / fps
+    id_anki_card = id_anki_card_for_segment(video_id, start_timestamp, end_timestamp)
+    return id_anki_card, start_timestamp, end_timestamp
+
+
+def segments_frames_thumbnailed(
     video: cv2.VideoCapture,
     video_path: str,
+    frames: list[tuple[str, int]],
+    thumbnail_files: ThumbnailFiles,
+    progress: bool = True,
+    frame_write: FrameWrite | None = None,
+) -> list[str]:
+    # `segments_frames`, but frames segmentize kept a thumbnail for are copied next to
+    # the video instead of decoded again
+    frames_decode: list[tuple[str, int]] = []
+    for id_anki_card, frame_number in frames:
+        thumbnail_path = thumbnail_for_frame(thumbnail_files, frame_number)
+        if thumbnail_path is None:
+            frames_decode.append((id_anki_card, frame_number))
+            continue
+        outfile, _outfile_name = outfile_path_and_name(video_path, id_anki_card, "jpg")
+        shutil.copyfile(thumbnail_path, outfile)
+
+    if frames_decode:
+        if progress:
+            print(
+                f"decoding {len(frames_decode)}/{len(frames)} frames without a"
+                " thumbnail"
+            )
+        segments_frames(video, video_path, frames_decode, progress, frame_write)
+    return [
+        outfile_path_and_name(video_path, id_anki_card, "jpg")[1]
+        for id_anki_card, _ in frames
+    ]
+
+
+def segment_mid_frame(segment: Segment) -> int:
+    start_frame_s, end_frame_s, _learning, _english = segment
+    return (int(start_frame_s) + int(end_frame_s)) // 2
+
+
+def segment_to_anki_video_frame_card_reqs(
+    segment: Segment,
+    audio_name: str,
+    frame_name: str,
     video_id: str,
     video_title: str,
     video_url: str,
     fps: float,
 ) -> AnkiVideoFrameCardReqs:
-    start_frame_s, end_frame_s, learning, english = segment
-    start_frame, end_frame = int(start_frame_s), int(end_frame_s)
-
-    start_timestamp, end_timestamp = start_frame / fps, end_frame / fps
-
-    id_anki_card = id_anki_card_for_segment(video_id, start_timestamp, end_timestamp)
-
-    audio_name = segment_audio(
-        video_path,
-        id_anki_card,
-        start_timestamp,
-        end_timestamp,
-    )
-
-    mid_frame = (start_frame + end_frame) // 2
-    frame_name = segment_frame(
-        video, mid_frame, video_path, video_id, start_timestamp, end_timestamp
-    )
+    _start_frame_s, _end_frame_s, learning, english = segment
+    id_anki_card, _, _ = segment_clip(segment, video_id, fps)
 
     return AnkiVideoFrameCardReqs(
         learning=learning,
@@ -281,7 +436,8 @@ def segments_to_video_cards(
     video_ini_path: str,
     input_file: str,
     output_file: str,
-):
+    jobs: int = config.ANKICARDS_JOBS_DEFAULT,
+) -> list[SegmentJob]:
     video_id, video_title, video_url = read_ini(video_ini_path)
 
     segments = segments_from_csv(input_file)
@@ -289,23 +445,257 @@ def segments_to_video_cards(
     video = cv2.VideoCapture(video_path)
     fps = video.get(cv2.CAP_PROP_FPS)
 
-    anki_card_reqs = (
-        segment_to_anki_video_full_card_reqs(
-            segment, video_path, video_id, video_title, video_url, fps
+    def encode(segment: Segment) -> tuple[AnkiVideoFullCardReqs | None, SegmentJob]:
+        id_anki_card, _, _ = segment_clip(segment, video_id, fps)
+        time_start = time.perf_counter()
+        try:
+            anki_card_reqs = segment_to_anki_video_full_card_reqs(
+                segment, video_path, video_id, video_title, video_url, fps
+            )
+        except subprocess.CalledProcessError as e:
+            # one segment failing to encode shouldn't lose the rest of the video
+            print(f"[warn] could not encode {id_anki_card}: {e}")
+            return None, SegmentJob(
+                id_anki_card, time.perf_counter() - time_start, str(e)
+            )
+        return anki_card_reqs, SegmentJob(
+            id_anki_card, time.perf_counter() - time_start, None
         )
-        for segment in segments
-    )
-    anki_cards = (
-        anki_video_full_card_reqs_to_anki_video_full_cards(anki_card_reqs)
-        for anki_card_reqs in anki_card_reqs
-    )
 
     with csv_rowwriter(output_file, "w") as writerow:
         writerow(AnkiVideoFullCard._fields)
 
-    with csv_rowwriter(output_file, "a") as writerow:
-        for anki_card in anki_cards:
-            writerow(anki_card)
+    segment_jobs: list[SegmentJob] = []
+    with (
+        ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="encode") as executor,
+        csv_rowwriter(output_file, "a") as writerow,
+    ):
+        # `map` runs `jobs` encodes at a time and yields them in segment order
+        for anki_card_reqs, segment_job in executor.map(encode, segments):
+            segment_jobs.append(segment_job)
+            if anki_card_reqs is not None:
+                writerow(
+                    anki_video_full_card_reqs_to_anki_video_full_cards(anki_card_reqs)
+                )
+
+    return segment_jobs
+
+
+def media_store_path_of(params: dict[str, Any]) -> str | None:
+    # the store a file was put in, frames have the store's settings along with it
+    store = params.get("store")
+    return store[0] if isinstance(store, list) else store
+
+
+class CardMedia:
+    # the audio and frames of a video's cards, going by the manifest next to the
+    # video. only what changed since the last run is cut, and can be cut a few
+    # segments at a time. with a store they're moved into it once cut.
+
+    def __init__(
+        self,
+        video_path: str,
+        thumbnail_files: ThumbnailFiles,
+        store: MediaStore | None = None,
+    ):
+        self.video_path = video_path
+        self.thumbnail_files = thumbnail_files
+        self.store = store
+        self.manifest_path = media_manifest_path(video_path)
+        self.manifest = media_manifest_read(self.manifest_path)
+        self.fingerprint = video_fingerprint(video_path)
+        self.video_dir = os.path.dirname(video_path)
+        self.media_dir = self.video_dir if store is None else str(store.path)
+        self.store_params = None if store is None else str(store.path)
+        self.frame_store_params = (
+            None if store is None else [self.store_params, *store.settings]
+        )
+
+    def audio_params(self, clip: tuple[str, float, float]) -> dict[str, Any]:
+        _id_anki_card, start, end = clip
+        return media_params(
+            video=self.fingerprint, start=start, end=end, store=self.store_params
+        )
+
+    def frame_thumbnail_files(self, video: cv2.VideoCapture) -> ThumbnailFiles:
+        # thumbnails are jpgs of the whole frame, a store keeping frames in another
+        # format or smaller would have to encode them again, so they're decoded from
+        # the video instead and only made lossy once
+        height, _width = video_size(video)
+        if self.store is None or self.store.takes_as_is("jpg", height):
+            return self.thumbnail_files
+        return []
+
+    def frame_params(
+        self, frame: tuple[str, int], thumbnail_files: ThumbnailFiles
+    ) -> dict[str, Any]:
+        _id_anki_card, frame_number = frame
+        thumbnail_path = thumbnail_for_frame(thumbnail_files, frame_number)
+        return media_params(
+            video=self.fingerprint,
+            frame=frame_number,
+            thumbnail=None if thumbnail_path is None else file_sha256(thumbnail_path),
+            store=self.frame_store_params,
+        )
+
+    def release(self, id_anki_card: str, kind: str, media: dict[str, Any]) -> None:
+        # only files the manifest made are removed, anything else next to the video
+        # stays. stored files are only removed once no card in any video uses them.
+        store_path = media_store_path_of(media["params"])
+        if store_path is None:
+            Path(self.video_dir, media["file"]).unlink(missing_ok=True)
+        elif self.store is not None and store_path == self.store_params:
+            self.store.release(f"{id_anki_card}.{kind}")
+        elif Path(store_path).is_dir():
+            # put in another store before, which only needs its index to release
+            with media_store(store_path, MEDIA_STORE_SETTINGS_DEFAULT) as store:
+                assert store is not None
+                store.release(f"{id_anki_card}.{kind}")
+
+    def record(
+        self,
+        id_anki_card: str,
+        kind: str,
+        params: dict[str, Any],
+        outfile: str,
+        name_stored: str | None = None,
+    ) -> None:
+        # `name_stored` when it was put in the store without writing `outfile`
+        path = outfile
+        if self.store is not None:
+            if name_stored is None:
+                name_stored = self.store.put_file(f"{id_anki_card}.{kind}", outfile)
+                os.remove(outfile)
+            path = str(self.store.path / name_stored)
+        # kept somewhere else before, like next to the video before there was a store.
+        # in the same place the new file took its name or ref over.
+        media_old = self.manifest.get(id_anki_card, {}).get(kind)
+        if (
+            media_old is not None
+            and media_store_path_of(media_old["params"]) != self.store_params
+        ):
+            self.release(id_anki_card, kind, media_old)
+        media_record(self.manifest, id_anki_card, kind, params, path)
+
+    def cut(
+        self,
+        video: cv2.VideoCapture,
+        clips: list[tuple[str, float, float]],
+        frames: list[tuple[str, int]],
+        progress: bool = True,
+    ) -> None:
+        clips_stale = [
+            (clip, params)
+            for clip in clips
+            if media_stale(
+                self.manifest,
+                clip[0],
+                "audio",
+                params := self.audio_params(clip),
+                self.media_dir,
+            )
+        ]
+        thumbnail_files = self.frame_thumbnail_files(video)
+        frames_stale = [
+            (frame, params)
+            for frame in frames
+            if media_stale(
+                self.manifest,
+                frame[0],
+                "frame",
+                params := self.frame_params(frame, thumbnail_files),
+                self.media_dir,
+            )
+        ]
+        # decoded frames go straight into the store, without a jpg in between
+        names_stored: dict[str, str] = {}
+        store = self.store
+        frame_write: FrameWrite | None = None
+        if store is not None:
+
+            def frame_store_write(id_anki_card: str, image: Frame) -> None:
+                names_stored[id_anki_card] = store.put_frame(
+                    f"{id_anki_card}.frame", image
+                )
+
+            frame_write = frame_store_write
+
+        if progress:
+            print(
+                f"cutting {len(clips_stale)}/{len(clips)} audio clips"
+                f" and {len(frames_stale)}/{len(frames)} frames"
+            )
+        # ffmpeg cuts the audio while the frames are decoded here
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            audio = executor.submit(
+                segments_audio,
+                self.video_path,
+                [clip for clip, _ in clips_stale],
+                progress,
+            )
+            segments_frames_thumbnailed(
+                video,
+                self.video_path,
+                [frame for frame, _ in frames_stale],
+                thumbnail_files,
+                progress,
+                frame_write,
+            )
+            audio.result()
+
+        for (id_anki_card, _, _), params in clips_stale:
+            self.record(
+                id_anki_card,
+                "audio",
+                params,
+                outfile_path_and_name(self.video_path, id_anki_card, "aac")[0],
+            )
+        for (id_anki_card, _), params in frames_stale:
+            self.record(
+                id_anki_card,
+                "frame",
+                params,
+                outfile_path_and_name(self.video_path, id_anki_card, "jpg")[0],
+                names_stored.get(id_anki_card),
+            )
+
+    def orphans_remove(self, ids_anki_card: Iterable[str]) -> None:
+        orphans = media_orphans(self.manifest, ids_anki_card)
+        for id_anki_card, kind, media in orphans:
+            self.release(id_anki_card, kind, media)
+        if orphans:
+            # a segment has an audio clip and a frame
+            segments_gone = len({id_anki_card for id_anki_card, _, _ in orphans})
+            print(f"removed the media of {segments_gone} segments that are gone")
+
+    def write(self) -> None:
+        media_manifest_write(self.manifest_path, self.manifest)
+
+    def name(self, id_anki_card: str, kind: str) -> str:
+        return self.manifest[id_anki_card][kind]["file"]
+
+
+def segments_media(
+    video: cv2.VideoCapture,
+    video_path: str,
+    clips: list[tuple[str, float, float]],
+    frames: list[tuple[str, int]],
+    thumbnail_files: ThumbnailFiles,
+    store: MediaStore | None = None,
+) -> tuple[list[str], list[str]]:
+    # cuts what changed and removes the media no segment has anymore
+    card_media = CardMedia(video_path, thumbnail_files, store)
+    card_media.cut(video, clips, frames)
+    card_media.orphans_remove(
+        [id_anki_card for id_anki_card, _, _ in clips]
+        + [id_anki_card for id_anki_card, _ in frames]
+    )
+    card_media.write()
+
+    return (
+        [card_media.name(id_anki_card, "audio") for id_anki_card, _, _ in clips],
+        [card_media.name(id_anki_card, "frame") for id_anki_card, _ in frames],
+    )
 
 
 def segments_to_frame_cards(
@@ -313,6 +703,9 @@ def segments_to_frame_cards(
     video_ini_path: str,
     input_file: str,
     output_file: str,
+    thumbnails_dir: str | None = None,
+    media_store_path: str | None = config.ANKICARDS_MEDIA_STORE_DEFAULT,
+    media_store_settings: MediaStoreSettings = MEDIA_STORE_SETTINGS_DEFAULT,
 ):
     video_id, video_title, video_url = read_ini(video_ini_path)
 
@@ -321,11 +714,28 @@ def segments_to_frame_cards(
     video = cv2.VideoCapture(video_path)
     fps = video.get(cv2.CAP_PROP_FPS)
 
+    segments = list(segments)
+    clips = [segment_clip(segment, video_id, fps) for segment in segments]
+    with media_store(media_store_path, media_store_settings) as store:
+        audio_names, frame_names = segments_media(
+            video,
+            video_path,
+            clips,
+            [
+                (id_anki_card, segment_mid_frame(segment))
+                for (id_anki_card, _, _), segment in zip(clips, segments, strict=True)
+            ],
+            [] if thumbnails_dir is None else thumbnails_read(Path(thumbnails_dir)),
+            store,
+        )
+
     anki_card_reqs = (
         segment_to_anki_video_frame_card_reqs(
-            segment, video, video_path, video_id, video_title, video_url, fps
+            segment, audio_name, frame_name, video_id, video_title, video_url, fps
+        )
+        for segment, audio_name, frame_name in zip(
+            segments, audio_names, frame_names, strict=True
         )
-        for segment in segments
     )
     anki_cards = (
         anki_video_frame_card_reqs_to_anki_video_frame_cards(anki_card_reqs)
@@ -334,8 +744,5 @@ def segments_to_frame_cards(
 
     with csv_rowwriter(output_file, "w") as writerow:
         writerow(AnkiVideoFrameCard._fields)
-
-    for anki_card in anki_cards:
-        with csv_rowwriter(output_file, "a") as writerow:
-            # raise RuntimeError("have to fix audio and frame field")
+        for anki_card in anki_cards:
             writerow(anki_card)
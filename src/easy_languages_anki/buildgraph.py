@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager, ExitStack, nullcontext
+from functools import cache
+from pathlib import Path
+from types import ModuleType
+from typing import Any, NamedTuple
+
+from .mediamanifest import video_fingerprint
+
+# bump when the way stages are fingerprinted changes, so all of them run again. stages
+# recorded by another version keep their outputs when they can adopt them.
+BUILD_GRAPH_VERSION = 3
+
+# files this big, like the video, are fingerprinted by their size and modification
+# time the way card media is, hashing them on every run reads gigabytes
+LARGE_FILE_BYTES = 64 * 1024 * 1024
+
+# modules of the package left out of the code a stage is fingerprinted by. what they
+# hold that changes the outputs, like the defaults in `config`, is in the params, and
+# rewording a help text shouldn't segmentize every video again.
+CODE_MODULES_SKIPPED = ("config", "profiling", "checkpoint")
+
+# `{stage: {"version", "fingerprint", "outputs": {name: fingerprint}}}`
+BuildRecord = dict[str, dict[str, Any]]
+
+# semaphores limiting how many stages needing a resource run at once, shared with
+# the pipelines of other videos
+Slots = dict[str, AbstractContextManager[Any]]
+
+RESOURCES = ("download", "cpu", "ffmpeg")
+
+
+class Stage(NamedTuple):
+    name: str
+    # files or directories it reads, the ones another stage makes are run after it
+    inputs: tuple[Path, ...]
+    outputs: tuple[Path, ...]
+    # everything that changes the outputs besides the inputs and the code
+    params: dict[str, Any]
+    # the modules doing the work, along with the ones they use from the same package
+    code: tuple[ModuleType, ...]
+    # writes the outputs to the paths it's given, they're moved in place once it's done
+    run: Callable[[list[Path]], None]
+    # whether outputs left by a run before there was a record can be kept
+    adopt: Callable[[], bool] | None = None
+    # the slots it waits for before running, like `cpu` or `download`. taken in the
+    # order of `RESOURCES`, so stages needing several can't wait on each other.
+    resources: tuple[str, ...] = ()
+
+
+def partial_path(path: Path) -> Path:
+    # a prefix, so files named after the output like `<output>.thumbnails` are
+    # partial alongside it
+    return path.with_name(f".partial-{path.name}")
+
+
+@cache
+def file_sha256(path: Path, stat_key: tuple[int, int, int]) -> str:
+    # by the stat too, so a file rewritten since is hashed again. many stages read
+    # the same files and a stage's outputs are the next one's inputs.
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def file_fingerprint(path: Path) -> str | None:
+    if path.is_dir():
+        digest = hashlib.sha256()
+        for child in sorted(path.iterdir()):
+            digest.update(f"{child.name}\0{file_fingerprint(child)}\0".encode())
+        return digest.hexdigest()
+    if not path.exists():
+        return None
+    stat = path.stat()
+    if stat.st_size >= LARGE_FILE_BYTES:
+        return video_fingerprint(str(path))
+    return file_sha256(path.resolve(), (stat.st_size, stat.st_mtime_ns, stat.st_ino))
+
+
+def code_modules(modules: tuple[ModuleType, ...]) -> list[ModuleType]:
+    # anything a module has from its own package, found through its globals
+    seen: dict[str, ModuleType] = {}
+    todo = list(modules)
+    while todo:
+        module = todo.pop()
+        if module.__name__ in seen:
+            continue
+        seen[module.__name__] = module
+        package = module.__name__.split(".")[0]
+        for value in vars(module).values():
+            name = (
+                value.__name__
+                if isinstance(value, ModuleType)
+                else getattr(value, "__module__", None)
+            )
+            if (
+                isinstance(name, str)
+                and name.split(".")[0] == package
+                and name in sys.modules
+                and name.split(".")[-1] not in CODE_MODULES_SKIPPED
+            ):
+                todo.append(sys.modules[name])
+    return [seen[name] for name in sorted(seen)]
+
+
+def code_fingerprint(modules: tuple[ModuleType, ...]) -> str:
+    digest = hashlib.sha256()
+    for module in code_modules(modules):
+        digest.update(module.__name__.encode())
+        digest.update(Path(module.__file__ or "").read_bytes())
+    return digest.hexdigest()
+
+
+def stage_fingerprint(stage: Stage) -> str:
+    fingerprint = {
+        "version": BUILD_GRAPH_VERSION,
+        # not by path, the pipeline can be run from anywhere
+        "inputs": [file_fingerprint(path) for path in stage.inputs],
+        "params": stage.params,
+        "code": code_fingerprint(stage.code),
+    }
+    return hashlib.sha256(
+        json.dumps(fingerprint, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def outputs_fingerprints(stage: Stage) -> dict[str, str | None]:
+    return {path.name: file_fingerprint(path) for path in stage.outputs}
+
+
+def build_record_read(path: Path) -> BuildRecord:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_record_write(path: Path, record: BuildRecord) -> None:
+    # written to the side and renamed, a crash while writing leaves the last one
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(path_tmp, "w") as f:
+        json.dump(record, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path_tmp, path)
+
+
+def stage_up_to_date(stage: Stage, record: BuildRecord, fingerprint: str) -> bool:
+    # ran with the same inputs, params and code, and nothing changed its outputs since
+    stage_record = record.get(stage.name)
+    return (
+        stage_record is not None
+        and stage_record["fingerprint"] == fingerprint
+        and stage_record["outputs"] == outputs_fingerprints(stage)
+        and None not in stage_record["outputs"].values()
+    )
+
+
+def stage_outputs_commit(stage: Stage) -> None:
+    for path in stage.outputs:
+        path_partial = partial_path(path)
+        if not path_partial.exists():
+            raise RuntimeError(f"stage {stage.name} did not write {path}")
+        if path.is_dir():
+            shutil.rmtree(path)
+        os.replace(path_partial, path)
+
+
+def stages_run(
+    stages: list[Stage], record_path: Path, slots: Slots | None = None
+) -> list[str]:
+    # runs every stage that isn't up to date once the stages making its inputs are
+    # done, the ones not waiting on each other at the same time. returns the names
+    # of the stages that ran.
+    makers = {path: stage.name for stage in stages for path in stage.outputs}
+    needs = {
+        stage.name: {makers[path] for path in stage.inputs if path in makers}
+        for stage in stages
+    }
+    record = build_record_read(record_path)
+    record_lock = threading.Lock()
+    ran: list[str] = []
+
+    def stage_run(stage: Stage) -> None:
+        fingerprint = stage_fingerprint(stage)
+        recorded = record.get(stage.name, {}).get("version") == BUILD_GRAPH_VERSION
+        if not recorded and stage.adopt is not None and stage.adopt():
+            print(
+                f"[warn] keeping the {stage.name} outputs from before it was recorded"
+            )
+        elif stage_up_to_date(stage, record, fingerprint):
+            print(f"{stage.name} is up to date")
+            return
+        else:
+            with ExitStack() as stack:
+                for resource in sorted(stage.resources, key=RESOURCES.index):
+                    stack.enter_context((slots or {}).get(resource, nullcontext()))
+                print(f"running {stage.name}")
+                stage.run([partial_path(path) for path in stage.outputs])
+            stage_outputs_commit(stage)
+            ran.append(stage.name)
+        with record_lock:
+            record[stage.name] = {
+                "version": BUILD_GRAPH_VERSION,
+                "fingerprint": fingerprint,
+                "outputs": outputs_fingerprints(stage),
+            }
+            build_record_write(record_path, record)
+
+    stages_by_name = {stage.name: stage for stage in stages}
+    done: set[str] = set()
+    running: dict[Future[None], str] = {}
+    with ThreadPoolExecutor(max_workers=len(stages) or 1) as executor:
+        while len(done) < len(stages):
+            for name, stage_needs in needs.items():
+                if (
+                    name not in done
+                    and name not in running.values()
+                    and stage_needs <= done
+                ):
+                    running[executor.submit(stage_run, stages_by_name[name])] = name
+            if not running:
+                raise ValueError(f"stages wait on each other: {needs.keys() - done}")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                # the stages after a failed one can't run
+                future.result()
+                done.add(running.pop(future))
+    return ran
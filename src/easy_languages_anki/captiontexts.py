@@ -0,0 +1,49 @@
+from collections.abc import Iterator
+
+from .stringdistance import levenshtein_distance
+
+
+class CaptionTexts:
+    # the distinct ocr'd variants of one caption. each variant keeps its summed
+    # levenshtein distance to all the others, so adding a variant costs one distance
+    # per variant and the medoid never has to be recomputed from all pairs
+
+    def __init__(self, text: str):
+        self.counts: dict[str, int] = {text: 1}
+        self.distance_sums: dict[str, int] = {text: 0}
+
+    @classmethod
+    def from_counts(cls, counts: dict[str, int]) -> "CaptionTexts":
+        texts = iter(counts)
+        caption_texts = cls(next(texts))
+        for text in texts:
+            caption_texts.add(text)
+        caption_texts.counts.update(counts)
+        return caption_texts
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.counts)
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __repr__(self) -> str:
+        return f"CaptionTexts({self.counts!r})"
+
+    def add(self, text: str) -> None:
+        if text in self.counts:
+            self.counts[text] += 1
+            return
+
+        distance_sum = 0
+        for other in self.counts:
+            distance = levenshtein_distance(text, other)
+            self.distance_sums[other] += distance
+            distance_sum += distance
+
+        self.counts[text] = 1
+        self.distance_sums[text] = distance_sum
+
+    def medoid(self) -> str:
+        # the variant closest to all the others, ties going to the first one seen
+        return min(self.distance_sums, key=self.distance_sums.__getitem__)
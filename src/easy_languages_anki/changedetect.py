@@ -0,0 +1,100 @@
+from collections.abc import Callable
+
+import cv2
+import numpy as np
+from skimage.metrics import structural_similarity
+
+from .framesource import Frame
+
+# scores a pair of subtitle regions between -1 (total dissimilarity) and 1 (identical),
+# comparable against `caption_video_similarity_cutoff`
+ChangeDetector = Callable[[Frame, Frame], float]
+
+CHANGE_DETECTORS = ("ssim", "tiered")
+
+SSIM_WIN_SIZE = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+# captions are white/yellow text, so anything this bright is treated as caption
+TIERED_CAPTION_MASK_THRESHOLD = 200
+# ssim drops at most this much per level of mean absolute pixel difference, and at
+# least this much per fraction of flipped caption pixels. about twice the margin of
+# what the fixture videos show, the shortcuts for a cutoff are derived from them.
+TIERED_SSIM_LOSS_PER_MEAN_ABS_DIFF = 0.06
+TIERED_SSIM_LOSS_PER_CAPTION_XOR = 1.5
+
+
+def ssim_skimage(frame_prev: Frame, frame: Frame) -> float:
+    return float(structural_similarity(frame_prev, frame))
+
+
+def ssim_box_filter(frame_prev: Frame, frame: Frame) -> float:
+    # same computation as `skimage.metrics.structural_similarity` with its defaults
+    # (7x7 uniform window, sample covariance) but on opencv's box filter
+    im1, im2 = frame_prev.astype(np.float64), frame.astype(np.float64)
+
+    def window_mean(image: np.ndarray) -> np.ndarray:
+        return cv2.boxFilter(
+            image,
+            cv2.CV_64F,
+            (SSIM_WIN_SIZE, SSIM_WIN_SIZE),
+            borderType=cv2.BORDER_REFLECT,
+        )
+
+    window_pixels = SSIM_WIN_SIZE**2
+    cov_norm = window_pixels / (window_pixels - 1)
+
+    ux, uy = window_mean(im1), window_mean(im2)
+    vx = cov_norm * (window_mean(im1 * im1) - ux * ux)
+    vy = cov_norm * (window_mean(im2 * im2) - uy * uy)
+    vxy = cov_norm * (window_mean(im1 * im2) - ux * uy)
+
+    s = ((2 * ux * uy + SSIM_C1) * (2 * vxy + SSIM_C2)) / (
+        (ux**2 + uy**2 + SSIM_C1) * (vx + vy + SSIM_C2)
+    )
+
+    pad = (SSIM_WIN_SIZE - 1) // 2
+    return float(s[pad:-pad, pad:-pad].mean(dtype=np.float64))
+
+
+def mean_abs_diff(frame_prev: Frame, frame: Frame) -> float:
+    return cv2.norm(frame_prev, frame, cv2.NORM_L1) / frame.size
+
+
+def caption_mask_xor(frame_prev: Frame, frame: Frame) -> float:
+    _, mask_prev = cv2.threshold(
+        frame_prev, TIERED_CAPTION_MASK_THRESHOLD, 255, cv2.THRESH_BINARY
+    )
+    _, mask = cv2.threshold(
+        frame, TIERED_CAPTION_MASK_THRESHOLD, 255, cv2.THRESH_BINARY
+    )
+    return cv2.countNonZero(cv2.bitwise_xor(mask_prev, mask)) / frame.size
+
+
+def tiered(cutoff: float) -> ChangeDetector:
+    # frames this close only differ by compression noise and score above `cutoff`,
+    # captions this far apart have certainly changed and score below it. at the
+    # default cutoff of 0.97 that's 0.5 levels and 2% of the pixels.
+    same_mean_abs_diff = (1 - cutoff) / TIERED_SSIM_LOSS_PER_MEAN_ABS_DIFF
+    changed_caption_xor = (1 - cutoff) / TIERED_SSIM_LOSS_PER_CAPTION_XOR
+
+    def frame_similarity(frame_prev: Frame, frame: Frame) -> float:
+        if mean_abs_diff(frame_prev, frame) <= same_mean_abs_diff:
+            return 1.0
+        caption_xor = caption_mask_xor(frame_prev, frame)
+        if caption_xor > 0 and caption_xor >= changed_caption_xor:
+            return -1.0
+        return ssim_box_filter(frame_prev, frame)
+
+    return frame_similarity
+
+
+def change_detector(name: str, cutoff: float) -> ChangeDetector:
+    # `cutoff` is the `caption_video_similarity_cutoff` the scores are compared against
+    if name == "ssim":
+        return ssim_skimage
+    elif name == "tiered":
+        return tiered(cutoff)
+
+    raise ValueError(f"unknown change detector: {name}")
@@ -0,0 +1,74 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, NamedTuple
+
+# a caption that may still be joined with the next segments, its texts as
+# `{text: times ocr'd}`
+SegmentPending = tuple[int, int, dict[str, int]]
+
+
+class SegmentizeCheckpoint(NamedTuple):
+    # the settings the segments were found with, resuming with other ones would
+    # mix up segments found in different ways
+    params: dict[str, Any]
+    # where the next segment starts, everything before it is written or pending
+    frame: int
+    segment_pending: SegmentPending | None
+    # the output is truncated to this before writing anything new
+    csv_offset: int
+    complete: bool
+
+
+def checkpoint_path(outfile: str) -> Path:
+    return Path(f"{outfile}.checkpoint.json")
+
+
+def checkpoint_read(path: Path) -> SegmentizeCheckpoint | None:
+    if not path.exists():
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+
+    segment_pending = checkpoint["segment_pending"]
+    return SegmentizeCheckpoint(
+        checkpoint["params"],
+        checkpoint["frame"],
+        None if segment_pending is None else tuple(segment_pending),
+        checkpoint["csv_offset"],
+        checkpoint["complete"],
+    )
+
+
+def checkpoint_write(path: Path, checkpoint: SegmentizeCheckpoint) -> None:
+    # written to the side and renamed, a crash while writing leaves the last one
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(path_tmp, "w") as f:
+        json.dump(checkpoint._asdict(), f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path_tmp, path)
+
+
+def checkpoint_resumable(
+    outfile: str, params: dict[str, Any]
+) -> SegmentizeCheckpoint | None:
+    checkpoint = checkpoint_read(checkpoint_path(outfile))
+    if checkpoint is None or not os.path.exists(outfile):
+        print(f"[warn] no checkpoint for {outfile}, starting over")
+        return None
+    # through json so tuples compare equal to the lists they were saved as
+    if checkpoint.params != json.loads(json.dumps(params)):
+        print("[warn] checkpoint was made with different settings, starting over")
+        return None
+    if os.path.getsize(outfile) < checkpoint.csv_offset:
+        print(f"[warn] {outfile} is shorter than its checkpoint, starting over")
+        return None
+    return checkpoint
+
+
+def segmentize_complete(outfile: str) -> bool:
+    # output without a checkpoint next to it is from before there were checkpoints,
+    # back then it was only ever left behind complete or missing its last rows
+    checkpoint = checkpoint_read(checkpoint_path(outfile))
+    return checkpoint is None or checkpoint.complete
@@ -1,4 +1,77 @@
+import os
+
 SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_DEFAULT = 0.97
 SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_HELP = "value between -1 and 1 below which the scene is considered to be changed (-1 means total dissimilarity and 1 means they're identical)"
 SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT = 0.7
 SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_HELP = "minumum levenshtein similarity between captions to be considered the same (0 means total dissimilarity and 1 means they're identical)"
+SEGMENTIZE_FRAME_SOURCE_DEFAULT = "opencv"
+SEGMENTIZE_FRAME_SOURCE_HELP = "how to decode frames: `opencv` decodes full frames, `ffmpeg` only hands over the subtitle region, the frames are the same either way"
+SEGMENTIZE_CHANGE_DETECTOR_DEFAULT = "ssim"
+SEGMENTIZE_CHANGE_DETECTOR_HELP = "how to score consecutive frames: `ssim` runs full ssim on every pair, `tiered` skips ssim when a cheap pixel difference / caption mask check is already conclusive for the cutoff"
+SEGMENTIZE_FRAME_STRIDE_DEFAULT = 1
+SEGMENTIZE_FRAME_STRIDE_HELP = "compare every n-th frame while the captions stay the same, and every frame from where they changed until n frames in a row are the same (1 compares every frame; a caption shown for less than n frames can be missed, and segments can differ where the similarity of frames hovers around the cutoff)"
+SEGMENTIZE_WORKERS_DEFAULT = 1
+SEGMENTIZE_WORKERS_HELP = "number of processes to segmentize with, each one decoding, comparing and ocr-ing its own part of the video"
+SEGMENTIZE_OCR_ENGINE_DEFAULT = "auto"
+SEGMENTIZE_OCR_ENGINE_HELP = "`tesserocr` keeps tesseract loaded in-process between segments, `pytesseract` starts a tesseract process per segment, `auto` uses `tesserocr` if it's installed"
+SEGMENTIZE_OCR_WORKERS_DEFAULT = 2
+SEGMENTIZE_OCR_WORKERS_HELP = (
+    "number of threads doing ocr in the background while frames are being compared"
+)
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "easy-languages-anki",
+)
+SEGMENTIZE_OCR_CACHE_DEFAULT = os.path.join(CACHE_DIR, "ocr.sqlite3")
+SEGMENTIZE_OCR_CACHE_HELP = (
+    "sqlite file caching ocr results by subtitle image, shared across runs and videos"
+)
+SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_DEFAULT = 200_000
+SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_HELP = (
+    "least recently used ocr results are evicted beyond this many"
+)
+SEGMENTIZE_SUBTITLE_LAYOUT_DEFAULT = "auto"
+SEGMENTIZE_SUBTITLE_LAYOUT_HELP = "where to look for captions: `auto` finds the caption box once per channel and resolution from sampled frames (also covering the fixed band, and found again for the next video, when few of them have captions), `fixed` uses the band from 78% to 92% of the frame height"
+SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_DEFAULT = os.path.join(
+    CACHE_DIR, "subtitle_layouts.json"
+)
+SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_HELP = "json file keeping the caption box found for each channel and resolution, delete an entry to find it again"
+SEGMENTIZE_CHECKPOINT_EVERY_DEFAULT = 25
+SEGMENTIZE_CHECKPOINT_EVERY_HELP = "save where segmentize is every this many segments, so `--resume` can continue from there"
+SEGMENTIZE_FRAME_PREFETCH_DEFAULT = 8
+SEGMENTIZE_FRAME_PREFETCH_HELP = "decode up to this many frames ahead on a separate thread while frames are being compared (0 decodes on the same thread)"
+SEGMENTIZE_PROFILE_HELP = "write the time, cpu time, calls and peak memory of each segmentize stage to this json file (slows segmentize down while tracing memory)"
+SEGMENTIZE_THUMBNAILS_HELP = "keep the sharpest frame of every segment next to the output while decoding, so the card frames don't have to be decoded again (needs the `opencv` frame source)"
+ANKICARDS_JOBS_DEFAULT = max((os.cpu_count() or 1) // 2, 1)
+ANKICARDS_JOBS_HELP = "number of segments to encode at once for full video cards, each in its own `ffmpeg` already encoding on a few threads (default half the cores)"
+ANKICARDS_THUMBNAILS_HELP = "directory of thumbnails kept by segmentize, card frames are copied from them instead of decoded"
+ANKICARDS_MEDIA_STORE_DEFAULT = None
+ANKICARDS_MEDIA_STORE_HELP = "directory to keep card media in named by content, so frames and clips that come out byte for byte the same in cards of any video are only kept once, the same intro in two videos usually doesn't (default next to the video, named by card). thumbnails are only used for frames it keeps as jpgs no taller than the video"
+ANKICARDS_FRAME_HEIGHT_DEFAULT = 480
+ANKICARDS_FRAME_HEIGHT_HELP = (
+    "frames taller than this are scaled down in the media store"
+)
+ANKICARDS_FRAME_FORMAT_DEFAULT = "webp"
+ANKICARDS_FRAME_FORMAT_HELP = "image format of frames in the media store"
+ANKICARDS_FRAME_QUALITY_DEFAULT = 80
+ANKICARDS_FRAME_QUALITY_HELP = "quality of frames in the media store, from 0 to 100"
+APKG_DECK_NAME_DEFAULT = "easy-languages"
+APKG_DECK_NAME_HELP = "deck the notes are imported into"
+APKG_MEDIA_DIRS_HELP = "directories to look for card media in besides the one the cards csv is in, like the media store"
+BATCH_CPU_SLOTS_HELP = "how many videos are segmentized at once (default as many as the cores fit segmentize workers times ocr workers)"
+BATCH_FFMPEG_SLOTS_DEFAULT = 2
+BATCH_FFMPEG_SLOTS_HELP = "how many videos have their card media cut at once, with `--stream` while they're segmentized"
+BATCH_DOWNLOAD_SLOTS_DEFAULT = 2
+BATCH_DOWNLOAD_SLOTS_HELP = "how many videos are downloaded at once"
+BATCH_VIDEOS_HELP = "how many videos are worked on at once, each waiting for a slot of what its next stage needs (default all the slots together)"
+PIPELINE_STREAM_HELP = "cut the media of cards while the video is still being segmentized, instead of after"
+VOCAB_SPACY_MODEL_DEFAULT = "es_core_news_md"
+VOCAB_SPACY_MODEL_HELP = "spacy model the words of notes are lemmatized with"
+VOCAB_SPACY_EXCLUDE_DEFAULT = ("parser", "ner", "senter")
+VOCAB_SPACY_EXCLUDE_HELP = "components of the spacy model not loaded, lemmatizing only needs the tagger or morphologizer, the attribute ruler and the lemmatizer"
+VOCAB_BATCH_SIZE_DEFAULT = 256
+VOCAB_BATCH_SIZE_HELP = "how many notes spacy lemmatizes at once"
+VOCAB_PROCESSES_DEFAULT = 1
+VOCAB_PROCESSES_HELP = (
+    "how many processes lemmatize notes, each loads its own copy of the spacy model"
+)
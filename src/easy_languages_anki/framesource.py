@@ -0,0 +1,186 @@
+import subprocess
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+Frame = np.ndarray
+
+# fills the given buffer with the next subtitle region, `False` once the video is done
+FrameReader = Callable[[Frame], bool]
+
+FRAME_SOURCES = ("opencv", "ffmpeg")
+
+# frames are handed out of a ring of preallocated buffers, so a frame is only valid
+# until `FRAME_RING_SIZE - 1` more frames have been read. copy it to keep it longer.
+FRAME_RING_SIZE = 3
+
+
+class SubtitleLayout(NamedTuple):
+    # where the captions are, as fractions of the frame height and width
+    top: float
+    bottom: float
+    left: float
+    right: float
+
+
+SUBTITLE_LAYOUT_DEFAULT = SubtitleLayout(0.78, 0.92, 0.0, 1.0)
+
+
+def subtitle_region_bounds(
+    height: int, width: int, layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT
+) -> tuple[int, int, int, int]:
+    top, bottom = int(layout.top * height), int(layout.bottom * height)
+    left, right = int(layout.left * width), int(layout.right * width)
+    return top, bottom, left, right
+
+
+def subtitle_region_shape(
+    height: int, width: int, layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT
+) -> tuple[int, int]:
+    top, bottom, left, right = subtitle_region_bounds(height, width, layout)
+    return bottom - top, right - left
+
+
+def video_size(video: cv2.VideoCapture) -> tuple[int, int]:
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    return height, width
+
+
+def opencv_reader(
+    video: cv2.VideoCapture,
+    frame_start: int = 0,
+    layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT,
+    frame_tap: Callable[[Frame], None] | None = None,
+) -> FrameReader:
+    height, width = video_size(video)
+    if frame_start:
+        video.set(cv2.CAP_PROP_POS_FRAMES, frame_start)
+    top, bottom, left, right = subtitle_region_bounds(height, width, layout)
+    frame_color: Frame = np.empty((height, width, 3), np.uint8)
+
+    def read_into(out: Frame) -> bool:
+        nonlocal frame_color
+        ret, frame_color = video.read(frame_color)
+        if not ret:
+            return False
+        if frame_color.shape[:2] != (height, width):
+            raise RuntimeError(
+                f"expected {width}x{height} frame, got {frame_color.shape[1::-1]}"
+            )
+        if frame_tap is not None:
+            # the full color frame, only valid until the next one is read
+            frame_tap(frame_color)
+        # converting only the subtitle region is pixel-for-pixel the same as
+        # converting the whole frame and cropping afterwards
+        cv2.cvtColor(frame_color[top:bottom, left:right], cv2.COLOR_BGR2GRAY, out)
+        return True
+
+    return read_into
+
+
+@contextmanager
+def ffmpeg_reader(
+    video_path: str,
+    height: int,
+    width: int,
+    fps: float,
+    frame_start: int = 0,
+    layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT,
+) -> Iterator[FrameReader]:
+    top, bottom, left, right = subtitle_region_bounds(height, width, layout)
+    region_height, region_width = bottom - top, right - left
+
+    # input seeking is frame accurate when decoding, half a frame early so rounding
+    # can't skip `frame_start`. frames are passed through as decoded, a constant frame
+    # rate output would fill the half frame before `frame_start` with a duplicate.
+    seek_timestamp = max(frame_start - 0.5, 0) / fps
+
+    process = subprocess.Popen(
+        [
+            "ffmpeg",
+            "-nostdin",
+            "-loglevel",
+            "error",
+            "-ss",
+            f"{seek_timestamp:.6f}",
+            "-i",
+            video_path,
+            "-an",  # no audio
+            "-fps_mode",
+            "passthrough",
+            # converted to bgr before cropping and made gray the way opencv does, so
+            # frames are pixel-for-pixel the ones the `opencv` source reads. ffmpeg's
+            # own gray is the luma plane stretched to full range, a level or so off.
+            "-vf",
+            f"format=bgr24,crop={region_width}:{region_height}:{left}:{top}:exact=1",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    stdout = process.stdout
+    assert stdout is not None
+    frame_color: Frame = np.empty((region_height, region_width, 3), np.uint8)
+    buffer = memoryview(frame_color).cast("B")
+
+    def read_into(out: Frame) -> bool:
+        read_total = 0
+        while read_total < len(buffer):
+            read = stdout.readinto(buffer[read_total:])
+            if not read:
+                break
+            read_total += read
+
+        if read_total == len(buffer):
+            cv2.cvtColor(frame_color, cv2.COLOR_BGR2GRAY, out)
+            return True
+
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {process.returncode}")
+        if read_total:
+            raise RuntimeError(
+                f"ffmpeg wrote a truncated frame ({read_total} of {len(buffer)} bytes)"
+            )
+        return False
+
+    try:
+        yield read_into
+    finally:
+        # stopped before ffmpeg is done, at the end of a chunk. killed before the pipe
+        # is closed, so it doesn't report writing to a closed pipe as an error.
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        stdout.close()
+
+
+@contextmanager
+def frame_reader(
+    video: cv2.VideoCapture,
+    video_path: str,
+    frame_source: str,
+    frame_start: int = 0,
+    layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT,
+    frame_tap: Callable[[Frame], None] | None = None,
+) -> Iterator[FrameReader]:
+    # `frame_tap` gets every full frame, the `ffmpeg` source never decodes them
+    if frame_source == "opencv":
+        yield opencv_reader(video, frame_start, layout, frame_tap)
+    elif frame_source == "ffmpeg":
+        if frame_tap is not None:
+            raise ValueError("the ffmpeg frame source only decodes the captions")
+        height, width = video_size(video)
+        fps = video.get(cv2.CAP_PROP_FPS)
+        with ffmpeg_reader(
+            video_path, height, width, fps, frame_start, layout
+        ) as read_into:
+            yield read_into
+    else:
+        raise ValueError(f"unknown frame source: {frame_source}")
@@ -1,7 +1,95 @@
+import threading
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+
 import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
 
 pytesseract.pytesseract.tesseract_cmd = "tesseract-ocr"
 
+OCR_ENGINES = ("auto", "tesserocr", "pytesseract")
+
+# page segmentation mode 6: a single uniform block of text
+TESSERACT_CONFIG = "--psm 6"
+
+TextExtractor = Callable[[Image.Image], str]
+
 
 def video_frame_extract_text(frame, lang):
-    return pytesseract.image_to_string(frame, lang, config="--psm 6").strip()
+    return pytesseract.image_to_string(frame, lang, config=TESSERACT_CONFIG).strip()
+
+
+@contextmanager
+def tesserocr_extractor(lang: str) -> Iterator[TextExtractor]:
+    if tesserocr is None:
+        raise RuntimeError("`tesserocr` is not installed")
+
+    # one api handle per thread, each keeps its traineddata loaded between calls.
+    # tesserocr releases the gil while recognizing, so the threads run in parallel
+    apis: list = []
+    apis_lock = threading.Lock()
+    thread_local = threading.local()
+
+    def extract_text(image: Image.Image) -> str:
+        api = getattr(thread_local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=lang, psm=tesserocr.PSM.SINGLE_BLOCK)
+            thread_local.api = api
+            with apis_lock:
+                apis.append(api)
+        api.SetImage(image)
+        return api.GetUTF8Text().strip()
+
+    try:
+        yield extract_text
+    finally:
+        for api in apis:
+            api.End()
+
+
+@contextmanager
+def pytesseract_extractor(lang: str) -> Iterator[TextExtractor]:
+    yield lambda image: video_frame_extract_text(image, lang)
+
+
+@contextmanager
+def text_extractor(engine: str, lang: str) -> Iterator[TextExtractor]:
+    if engine == "auto":
+        engine = "pytesseract" if tesserocr is None else "tesserocr"
+        if tesserocr is None:
+            print(
+                "[warn] `tesserocr` is not installed, starting a tesseract process per"
+                " segment (install the `ocr` extra to keep it loaded)"
+            )
+    print(f"ocr engine: {engine}")
+
+    if engine == "tesserocr":
+        with tesserocr_extractor(lang) as extract_text:
+            yield extract_text
+    elif engine == "pytesseract":
+        with pytesseract_extractor(lang) as extract_text:
+            yield extract_text
+    else:
+        raise ValueError(f"unknown ocr engine: {engine}")
+
+
+@contextmanager
+def text_extractor_pool(
+    engine: str,
+    lang: str,
+    workers: int,
+    wrap: Callable[[TextExtractor], TextExtractor] | None = None,
+) -> Iterator[Callable[[Image.Image], Future[str]]]:
+    # `wrap` is applied to the extractor the threads call, e.g. to time it
+    with (
+        text_extractor(engine, lang) as extract_text,
+        ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr") as executor,
+    ):
+        extract = extract_text if wrap is None else wrap(extract_text)
+        yield lambda image: executor.submit(extract, image)
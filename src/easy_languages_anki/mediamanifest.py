@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+# bump when the way media is cut changes, so all of it is cut again
+MEDIA_VERSION = 1
+
+# `{id_anki_card: {kind: {"file", "params", "sha256"}}}`, kind being `audio` or
+# `frame`, `params` everything the file was made from
+MediaManifest = dict[str, dict[str, dict[str, Any]]]
+
+
+def media_manifest_path(video_path: str) -> Path:
+    return Path(f"{video_path}.media.json")
+
+
+def media_manifest_read(path: Path) -> MediaManifest:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def media_manifest_write(path: Path, manifest: MediaManifest) -> None:
+    # written to the side and renamed, a crash while writing leaves the last one
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(path_tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path_tmp, path)
+
+
+def video_fingerprint(video_path: str) -> str:
+    # hashing the whole video on every run would take longer than cutting the media
+    stat = os.stat(video_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def file_sha256(path: str | Path) -> str | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def media_params(**params: Any) -> dict[str, Any]:
+    # through json so they compare equal to the ones read back from the manifest
+    return json.loads(json.dumps({**params, "version": MEDIA_VERSION}))
+
+
+def media_stale(
+    manifest: MediaManifest,
+    id_anki_card: str,
+    kind: str,
+    params: dict[str, Any],
+    media_dir: str,
+) -> bool:
+    # made from something else, or changed or deleted since
+    media = manifest.get(id_anki_card, {}).get(kind)
+    return (
+        media is None
+        or media["params"] != params
+        or media["sha256"] != file_sha256(os.path.join(media_dir, media["file"]))
+    )
+
+
+def media_record(
+    manifest: MediaManifest,
+    id_anki_card: str,
+    kind: str,
+    params: dict[str, Any],
+    path: str | Path,
+) -> None:
+    manifest.setdefault(id_anki_card, {})[kind] = {
+        "file": os.path.basename(path),
+        "params": params,
+        "sha256": file_sha256(path),
+    }
+
+
+def media_orphans(
+    manifest: MediaManifest, ids_anki_card: Iterable[str]
+) -> list[tuple[str, str, dict[str, Any]]]:
+    # takes the media of cards that are gone out of the manifest, as
+    # `(id_anki_card, kind, media)`
+    ids_keep = set(ids_anki_card)
+    return [
+        (id_anki_card, kind, media)
+        for id_anki_card in [id_ for id_ in manifest if id_ not in ids_keep]
+        for kind, media in manifest.pop(id_anki_card).items()
+    ]
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import cv2
+
+from . import config
+from .framesource import Frame
+
+FRAME_FORMATS = ("jpg", "webp", "avif")
+
+# the quality flag of each format, avif needs opencv built with libavif
+FRAME_FORMAT_QUALITY = {
+    "jpg": cv2.IMWRITE_JPEG_QUALITY,
+    "webp": cv2.IMWRITE_WEBP_QUALITY,
+    "avif": getattr(cv2, "IMWRITE_AVIF_QUALITY", None),
+}
+
+# names are this many hex digits of the content's sha256
+NAME_DIGITS = 32
+
+
+class MediaStoreSettings(NamedTuple):
+    # frames taller than this are scaled down, `None` keeps them as they are
+    frame_height: int | None
+    frame_format: str
+    frame_quality: int
+
+
+MEDIA_STORE_SETTINGS_DEFAULT = MediaStoreSettings(
+    config.ANKICARDS_FRAME_HEIGHT_DEFAULT,
+    config.ANKICARDS_FRAME_FORMAT_DEFAULT,
+    config.ANKICARDS_FRAME_QUALITY_DEFAULT,
+)
+
+
+class MediaStore:
+    # media named by its content, so a frame or clip that comes out byte for byte the
+    # same in many cards or videos is only kept once, like cards of a video made from
+    # it again in another directory. the same intro decoded from two encodes of it is
+    # never exactly the same, so it's kept once for each. the index has which cards
+    # use which file, a file is removed once no card uses it anymore.
+
+    def __init__(self, path: Path, settings: MediaStoreSettings):
+        quality_flag = FRAME_FORMAT_QUALITY.get(settings.frame_format)
+        if quality_flag is None or not cv2.haveImageWriter(
+            f"frame.{settings.frame_format}"
+        ):
+            raise ValueError(f"opencv can't write {settings.frame_format} frames")
+        self.quality_flag = quality_flag
+
+        path.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.settings = settings
+        # videos made into cards at the same time share the index, transactions are
+        # started by hand so writing and removing files happens while holding the lock.
+        # frames are put from the threads writing them, one at a time.
+        self.db = sqlite3.connect(
+            path / "index.sqlite3",
+            timeout=60,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.db_lock = threading.Lock()
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS refs (ref TEXT PRIMARY KEY, name TEXT NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS refs_name ON refs (name)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        with self.db_lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+
+    def _unreferenced_remove(self, name: str) -> None:
+        (refs,) = self.db.execute(
+            "SELECT COUNT(*) FROM refs WHERE name = ?", (name,)
+        ).fetchone()
+        if refs == 0:
+            (self.path / name).unlink(missing_ok=True)
+
+    def takes_as_is(self, extension: str, height: int) -> bool:
+        # whether an already encoded frame can be kept without encoding it again
+        frame_height = self.settings.frame_height
+        return extension == self.settings.frame_format and (
+            frame_height is None or height <= frame_height
+        )
+
+    def frame_encode(self, image: Frame) -> bytes:
+        # from the decoded frame, so it's only made lossy once
+        height, width = image.shape[:2]
+        frame_height = self.settings.frame_height
+        if frame_height is not None and height > frame_height:
+            image = cv2.resize(
+                image,
+                (round(width * frame_height / height), frame_height),
+                interpolation=cv2.INTER_AREA,
+            )
+        ret, encoded = cv2.imencode(
+            f".{self.settings.frame_format}",
+            image,
+            [self.quality_flag, self.settings.frame_quality],
+        )
+        if not ret:
+            raise RuntimeError(f"could not encode a {self.settings.frame_format} frame")
+        return encoded.tobytes()
+
+    def put(self, ref: str, content: bytes, extension: str) -> str:
+        name = f"{hashlib.sha256(content).hexdigest()[:NAME_DIGITS]}.{extension}"
+        with self._transaction():
+            row = self.db.execute(
+                "SELECT name FROM refs WHERE ref = ?", (ref,)
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO refs (ref, name) VALUES (?, ?)", (ref, name)
+            )
+            path = self.path / name
+            if not path.exists():
+                path_tmp = path.with_name(f"{name}.{os.getpid()}.tmp")
+                path_tmp.write_bytes(content)
+                os.replace(path_tmp, path)
+            if row is not None and row[0] != name:
+                self._unreferenced_remove(row[0])
+        return name
+
+    def put_frame(self, ref: str, image: Frame) -> str:
+        return self.put(ref, self.frame_encode(image), self.settings.frame_format)
+
+    def put_file(self, ref: str, path: str) -> str:
+        return self.put(ref, Path(path).read_bytes(), Path(path).suffix.lstrip("."))
+
+    def release(self, ref: str) -> None:
+        with self._transaction():
+            row = self.db.execute(
+                "SELECT name FROM refs WHERE ref = ?", (ref,)
+            ).fetchone()
+            if row is None:
+                return
+            self.db.execute("DELETE FROM refs WHERE ref = ?", (ref,))
+            self._unreferenced_remove(row[0])
+
+    def close(self) -> None:
+        self.db.close()
+
+
+@contextmanager
+def media_store(
+    path: str | None, settings: MediaStoreSettings
+) -> Iterator[MediaStore | None]:
+    if path is None:
+        yield None
+        return
+
+    store = MediaStore(Path(path).expanduser(), settings)
+    try:
+        yield store
+    finally:
+        store.close()
@@ -0,0 +1,137 @@
+import hashlib
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import cv2
+import numpy as np
+
+from .framesource import Frame
+
+# the key is built from the binarized region at this fraction of its size, so frames
+# that only differ by compression noise share a key
+KEY_DOWNSCALE = 2
+
+
+class OcrCacheStats(NamedTuple):
+    hits: int
+    misses: int
+
+
+def ocr_cache_key(subtitle_region: Frame, lang: str, tesseract_config: str) -> str:
+    height, width = subtitle_region.shape
+    region_small = cv2.resize(
+        subtitle_region,
+        (max(width // KEY_DOWNSCALE, 1), max(height // KEY_DOWNSCALE, 1)),
+        interpolation=cv2.INTER_AREA,
+    )
+    _, region_binary = cv2.threshold(
+        region_small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+    )
+
+    digest = hashlib.sha256()
+    digest.update(f"{lang}\0{tesseract_config}\0{region_binary.shape}\0".encode())
+    digest.update(np.packbits(region_binary > 0).tobytes())
+    return digest.hexdigest()
+
+
+class OcrCache:
+    # least recently used entries are evicted once there are more than `max_entries`
+
+    def __init__(self, path: Path, max_entries: int):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # parallel segmentize workers share the file
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS ocr"
+            " (key TEXT PRIMARY KEY, text TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS ocr_used ON ocr (used)")
+        self.db.commit()
+
+        self.max_entries = max_entries
+        self.entries = self._entries_count()
+        self.hits = 0
+        self.misses = 0
+
+    def _entries_count(self) -> int:
+        (entries,) = self.db.execute("SELECT COUNT(*) FROM ocr").fetchone()
+        return entries
+
+    def _used_next(self) -> int:
+        (used_max,) = self.db.execute(
+            "SELECT COALESCE(MAX(used), 0) FROM ocr"
+        ).fetchone()
+        return used_max + 1
+
+    def get(self, key: str) -> str | None:
+        row = self.db.execute("SELECT text FROM ocr WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        with self.db:
+            self.db.execute(
+                "UPDATE ocr SET used = ? WHERE key = ?", (self._used_next(), key)
+            )
+        (text,) = row
+        return text
+
+    def put(self, key: str, text: str) -> None:
+        with self.db:
+            used = self._used_next()
+            # another worker may have missed on the same image and put it first, only
+            # a new row counts towards `max_entries`
+            added = self.db.execute(
+                "INSERT OR IGNORE INTO ocr (key, text, used) VALUES (?, ?, ?)",
+                (key, text, used),
+            ).rowcount
+            if not added:
+                self.db.execute(
+                    "UPDATE ocr SET text = ?, used = ? WHERE key = ?", (text, used, key)
+                )
+        self.entries += added
+
+        if self.entries > self.max_entries:
+            with self.db:
+                self.db.execute(
+                    "DELETE FROM ocr WHERE key IN"
+                    " (SELECT key FROM ocr ORDER BY used LIMIT ?)",
+                    (self.entries - self.max_entries,),
+                )
+            # other processes may be writing to the same cache
+            self.entries = self._entries_count()
+
+    def stats(self) -> OcrCacheStats:
+        return OcrCacheStats(self.hits, self.misses)
+
+    def close(self) -> None:
+        self.db.close()
+
+
+@contextmanager
+def ocr_cache(path: str | None, max_entries: int) -> Iterator[OcrCache | None]:
+    if path is None:
+        yield None
+        return
+
+    cache = OcrCache(Path(path).expanduser(), max_entries)
+    try:
+        yield cache
+    finally:
+        cache.close()
+
+
+def ocr_cache_stats(cache: OcrCache | None) -> OcrCacheStats:
+    return OcrCacheStats(0, 0) if cache is None else cache.stats()
+
+
+def ocr_cache_report(stats: OcrCacheStats) -> None:
+    hits, misses = stats
+    lookups = hits + misses
+    hit_rate = hits / lookups if lookups else 0
+    print(f"ocr cache: {hits} hits, {misses} misses ({hit_rate:.0%} hit rate)")
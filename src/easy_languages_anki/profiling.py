@@ -0,0 +1,167 @@
+import json
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Any, NamedTuple
+
+
+class StageStats(NamedTuple):
+    wall: float
+    cpu: float
+    calls: int
+    # most memory allocated on top of what was in use when the stage was entered,
+    # including by the stages it calls. only traced on the thread that started
+    # profiling.
+    memory_peak: int | None
+
+
+def stage_stats_merge(stats: StageStats, other: StageStats) -> StageStats:
+    memory_peaks = [
+        peak for peak in (stats.memory_peak, other.memory_peak) if peak is not None
+    ]
+    return StageStats(
+        stats.wall + other.wall,
+        stats.cpu + other.cpu,
+        stats.calls + other.calls,
+        max(memory_peaks, default=None),
+    )
+
+
+class _StageCall:
+    def __init__(self, traced: bool):
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.wall_children = 0.0
+        self.cpu_children = 0.0
+        self.traced = traced
+        self.memory_start, self.memory_peak = 0, 0
+        if traced:
+            self.memory_start, _ = tracemalloc.get_traced_memory()
+            self.memory_peak = self.memory_start
+
+
+class Profiler:
+    # a stage's time excludes the time spent in the stages it calls or pulls from, so
+    # the stages of a generator chain add up instead of each including everything
+    # upstream of it
+
+    def __init__(self):
+        self.stages: dict[str, StageStats] = {}
+        self.lock = threading.Lock()
+        self.thread_local = threading.local()
+        self.thread_traced = threading.get_ident()
+        tracemalloc.start()
+
+    def _calls(self) -> list[_StageCall]:
+        calls = getattr(self.thread_local, "calls", None)
+        if calls is None:
+            calls = self.thread_local.calls = []
+        return calls
+
+    def _enter(self) -> _StageCall:
+        traced = threading.get_ident() == self.thread_traced
+        calls = self._calls()
+        if traced:
+            # the caller's peak so far, before it's reset for this call
+            _, memory_peak = tracemalloc.get_traced_memory()
+            for call in calls:
+                call.memory_peak = max(call.memory_peak, memory_peak)
+            tracemalloc.reset_peak()
+        call = _StageCall(traced)
+        calls.append(call)
+        return call
+
+    def _exit(self, name: str, call: _StageCall) -> None:
+        wall = time.perf_counter() - call.wall_start
+        cpu = time.thread_time() - call.cpu_start
+        calls = self._calls()
+        calls.pop()
+
+        memory_peak = None
+        if call.traced:
+            _, memory_peak_traced = tracemalloc.get_traced_memory()
+            call.memory_peak = max(call.memory_peak, memory_peak_traced)
+            memory_peak = call.memory_peak - call.memory_start
+        if calls:
+            caller = calls[-1]
+            caller.wall_children += wall
+            caller.cpu_children += cpu
+            caller.memory_peak = max(caller.memory_peak, call.memory_peak)
+
+        stats = StageStats(
+            wall - call.wall_children, cpu - call.cpu_children, 1, memory_peak
+        )
+        with self.lock:
+            stats_prev = self.stages.get(name)
+            self.stages[name] = (
+                stats if stats_prev is None else stage_stats_merge(stats_prev, stats)
+            )
+
+    def iterator[T](self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        iterator = iter(iterable)
+        while True:
+            call = self._enter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._exit(name, call)
+            yield item
+
+    def function[**P, R](self, name: str, function: Callable[P, R]) -> Callable[P, R]:
+        def function_profiled(*args: P.args, **kwargs: P.kwargs) -> R:
+            call = self._enter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._exit(name, call)
+
+        return function_profiled
+
+    def stop(self) -> dict[str, StageStats]:
+        tracemalloc.stop()
+        return self.stages
+
+
+# profiling is off without a profiler, and then nothing is wrapped
+
+
+def profiled_iterator[T](
+    profiler: Profiler | None, name: str, iterator: Iterator[T]
+) -> Iterator[T]:
+    return iterator if profiler is None else profiler.iterator(name, iterator)
+
+
+def profiled_function[**P, R](
+    profiler: Profiler | None, name: str, function: Callable[P, R]
+) -> Callable[P, R]:
+    return function if profiler is None else profiler.function(name, function)
+
+
+def stages_merge(
+    stages: dict[str, StageStats], stages_other: dict[str, StageStats]
+) -> dict[str, StageStats]:
+    stages_merged = dict(stages)
+    for name, stats in stages_other.items():
+        stats_prev = stages_merged.get(name)
+        stages_merged[name] = (
+            stats if stats_prev is None else stage_stats_merge(stats_prev, stats)
+        )
+    return stages_merged
+
+
+def profile_report_write(
+    path: str, wall: float, stages: dict[str, StageStats], info: dict[str, Any]
+) -> None:
+    report = {
+        **info,
+        "wall": wall,
+        "stages": {name: stats._asdict() for name, stats in stages.items()},
+    }
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"profile written to {path}")
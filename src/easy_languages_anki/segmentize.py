@@ -1,39 +1,203 @@
 import csv
-from collections.abc import Generator, Iterator
+import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
 from contextlib import contextmanager
+from functools import partial
+from itertools import count, islice, pairwise
+from pathlib import Path
+from typing import Any, NamedTuple
 
 import cv2
 import numpy as np
 from PIL import Image
-from skimage.metrics import structural_similarity as ssim
 from tqdm import tqdm
 
-from . import config, imagetotext
+from . import changedetect, config, imagetotext, subtitlelayout
+from .captiontexts import CaptionTexts
+from .changedetect import ChangeDetector
+from .checkpoint import (
+    SegmentizeCheckpoint,
+    checkpoint_path,
+    checkpoint_resumable,
+    checkpoint_write,
+)
+from .framesource import (
+    FRAME_RING_SIZE,
+    SUBTITLE_LAYOUT_DEFAULT,
+    Frame,
+    FrameReader,
+    SubtitleLayout,
+    frame_reader,
+    subtitle_region_bounds,
+    subtitle_region_shape,
+    video_size,
+)
+from .ocrcache import (
+    OcrCache,
+    OcrCacheStats,
+    ocr_cache,
+    ocr_cache_key,
+    ocr_cache_report,
+    ocr_cache_stats,
+)
+from .profiling import (
+    Profiler,
+    StageStats,
+    profile_report_write,
+    profiled_function,
+    profiled_iterator,
+    stages_merge,
+)
 from .segment import SegmentRawText
+from .stringdistance import levenshtein_similarity_exceeds
+from .thumbnails import (
+    SegmentThumbnails,
+    ThumbnailPicker,
+    segment_thumbnail_write,
+    thumbnails_path,
+    thumbnails_reset,
+)
+
+# parallel segmentize splits the video into more chunks than workers so a slow chunk
+# doesn't leave the other workers idle, but not into chunks shorter than this
+CHUNKS_PER_WORKER = 4
+CHUNK_FRAMES_MIN = 900
+
+OCR_QUEUE_PER_WORKER = 4
+
+
+class SegmentizeSettings(NamedTuple):
+    caption_video_similarity_cutoff: float
+    caption_text_similarity_cutoff: float
+    frame_source: str
+    change_detector: str
+    frame_stride: int
+    workers: int
+    ocr_engine: str
+    ocr_workers: int
+    # `None` doesn't cache ocr results
+    ocr_cache_path: str | None
+    ocr_cache_max_entries: int
+    subtitle_layout: str
+    # `None` finds the caption box for every video without keeping it
+    layout_profiles: str | None
+    checkpoint_every: int
+    frame_prefetch: int
+    # `None` doesn't profile
+    profile_path: str | None
+    thumbnails: bool
+
+
+SEGMENTIZE_SETTINGS_DEFAULT = SegmentizeSettings(
+    config.SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_DEFAULT,
+    config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT,
+    config.SEGMENTIZE_FRAME_SOURCE_DEFAULT,
+    config.SEGMENTIZE_CHANGE_DETECTOR_DEFAULT,
+    config.SEGMENTIZE_FRAME_STRIDE_DEFAULT,
+    config.SEGMENTIZE_WORKERS_DEFAULT,
+    config.SEGMENTIZE_OCR_ENGINE_DEFAULT,
+    config.SEGMENTIZE_OCR_WORKERS_DEFAULT,
+    config.SEGMENTIZE_OCR_CACHE_DEFAULT,
+    config.SEGMENTIZE_OCR_CACHE_MAX_ENTRIES_DEFAULT,
+    config.SEGMENTIZE_SUBTITLE_LAYOUT_DEFAULT,
+    config.SEGMENTIZE_SUBTITLE_LAYOUT_PROFILES_DEFAULT,
+    config.SEGMENTIZE_CHECKPOINT_EVERY_DEFAULT,
+    config.SEGMENTIZE_FRAME_PREFETCH_DEFAULT,
+    None,
+    False,
+)
+
+
+def frame_generator(
+    read_into: FrameReader, shape: tuple[int, int], ring_size: int = FRAME_RING_SIZE
+) -> Generator[Frame, None, None]:
+    ring = np.empty((ring_size, *shape), np.uint8)
+    for frame_num in count():
+        frame = ring[frame_num % ring_size]
+        if not read_into(frame):
+            break
+        yield frame
 
-Frame = np.ndarray
 
+@contextmanager
+def frame_generator_prefetch(
+    read_into: FrameReader,
+    shape: tuple[int, int],
+    prefetch: int,
+    ring_size: int = FRAME_RING_SIZE,
+) -> Iterator[Iterator[Frame]]:
+    # same frames as `frame_generator`, but decoded on a thread up to `prefetch` frames
+    # ahead of the consumer. buffers go from `buffers_free` to the decode thread to
+    # `buffers_filled` to the consumer, and back once the consumer is `ring_size`
+    # frames past them.
+    buffers = np.empty((ring_size + prefetch, *shape), np.uint8)
+    buffers_free: queue.SimpleQueue[int] = queue.SimpleQueue()
+    for buffer in range(len(buffers)):
+        buffers_free.put(buffer)
+    # `None` once the video is done, the exception if decoding failed
+    buffers_filled: queue.SimpleQueue[int | BaseException | None] = queue.SimpleQueue()
+    stopped = threading.Event()
+
+    def decode() -> None:
+        try:
+            while not stopped.is_set():
+                buffer = buffers_free.get()
+                if stopped.is_set() or not read_into(buffers[buffer]):
+                    break
+                buffers_filled.put(buffer)
+        except BaseException as e:
+            buffers_filled.put(e)
+            return
+        buffers_filled.put(None)
+
+    def frames() -> Generator[Frame, None, None]:
+        buffers_handed: deque[int] = deque()
+        while (buffer := buffers_filled.get()) is not None:
+            if isinstance(buffer, BaseException):
+                raise buffer
+            buffers_handed.append(buffer)
+            if len(buffers_handed) > ring_size:
+                buffers_free.put(buffers_handed.popleft())
+            yield buffers[buffer]
+
+    # opencv and the ffmpeg pipe release the gil while decoding
+    thread = threading.Thread(target=decode, name="decode", daemon=True)
+    thread.start()
+    try:
+        yield frames()
+    finally:
+        stopped.set()
+        # wake the thread up in case it's waiting for a free buffer
+        buffers_free.put(0)
+        thread.join()
 
-def frame_generator(video: cv2.VideoCapture) -> Generator[Frame, None, None]:
-    while True:
-        ret: bool
-        frame_color: Frame | None
-        ret, frame_color = video.read()
-        if ret:
-            frame_bw = cv2.cvtColor(frame_color, cv2.COLOR_BGR2GRAY)
-            yield frame_bw
-        else:
-            break
+
+@contextmanager
+def frame_stream(
+    read_into: FrameReader, shape: tuple[int, int], prefetch: int
+) -> Iterator[Iterator[Frame]]:
+    if prefetch > 0:
+        with frame_generator_prefetch(read_into, shape, prefetch) as frames:
+            yield frames
+    else:
+        yield frame_generator(read_into, shape)
 
 
 FramePair = tuple[Frame, Frame, int]
 
 
 def frame_pair_generator(
-    frame_generator: Iterator[Frame],
+    frame_generator: Iterator[Frame], frame_start: int = 0
 ) -> Iterator[FramePair]:
-    frame_prev = next(frame_generator)
-    for frame_num, frame in enumerate(frame_generator, start=1):
+    frame_prev = next(frame_generator, None)
+    if frame_prev is None:
+        return
+    for frame_num, frame in enumerate(frame_generator, start=frame_start + 1):
         yield (frame_prev, frame, frame_num)
         frame_prev = frame
 
@@ -42,176 +206,624 @@ Segment = tuple[int, int, float, Frame]
 
 
 def segment_finder(
-    frame_generator: Iterator[FramePair], caption_video_similarity_cutoff: float
+    frame_generator: Iterator[FramePair],
+    caption_video_similarity_cutoff: float,
+    frame_similarity: ChangeDetector = changedetect.ssim_skimage,
+    segment_start: int = 0,
 ) -> Iterator[Segment]:
-    segment_start: int = 0
     for frame_prev, frame, frame_num in frame_generator:
-        frame_prev_subtitle_region = extract_subtitle_region(frame_prev)
-        score: float
-        _diff: Frame
-        score, _diff = ssim(
-            frame_prev_subtitle_region,
-            extract_subtitle_region(frame),
-            full=True,
-        )
+        score: float = frame_similarity(frame_prev, frame)
 
         if score < caption_video_similarity_cutoff:
-            yield (segment_start, frame_num - 1, score, frame_prev_subtitle_region)
+            yield (segment_start, frame_num - 1, score, frame_prev)
             segment_start = frame_num
 
 
-def extract_subtitle_region(frame: Frame) -> Frame:
-    h, w = frame.shape
-    subtitle_region = frame[int(0.78 * h) : int(0.92 * h), 0:w]
+def segment_finder_strided(
+    frame_generator: Iterator[Frame],
+    caption_video_similarity_cutoff: float,
+    frame_similarity: ChangeDetector,
+    frame_stride: int,
+    segment_start: int = 0,
+) -> Iterator[Segment]:
+    # only compares every `frame_stride`th frame while they stay the same. once the
+    # ends of a stride differ, its frames and the ones after it are compared one by one
+    # until `frame_stride` of them in a row are the same. a change that is undone
+    # within one stride is not seen, and where the similarity hovers around the cutoff
+    # frames a stride apart can compare otherwise than the ones in between.
+    frame_first = next(frame_generator, None)
+    if frame_first is None:
+        return
+    window = np.empty((frame_stride + 1, *frame_first.shape), np.uint8)
+    window[0] = frame_first
+    window_start: int = segment_start
+    same_in_a_row = frame_stride
+
+    while True:
+        striding = same_in_a_row >= frame_stride
+        window_end = 0
+        for window_end, frame in enumerate(
+            islice(frame_generator, frame_stride if striding else 1), 1
+        ):
+            window[window_end] = frame
+        if window_end == 0:
+            break
+
+        if (
+            not striding
+            or window_end == 1
+            or frame_similarity(window[0], window[window_end])
+            < caption_video_similarity_cutoff
+        ):
+            for window_index in range(1, window_end + 1):
+                score = frame_similarity(window[window_index - 1], window[window_index])
+                if score >= caption_video_similarity_cutoff:
+                    same_in_a_row += 1
+                    continue
+                frame_num = window_start + window_index
+                yield (segment_start, frame_num - 1, score, window[window_index - 1])
+                segment_start = frame_num
+                same_in_a_row = 0
+
+        window[0] = window[window_end]
+        window_start += window_end
+
+
+def segments_thumbnailed(
+    segments: Iterator[Segment], thumbnail_picker: ThumbnailPicker
+) -> Iterator[Segment]:
+    for segment in segments:
+        _segment_start, segment_end, _score, _subtitle_region = segment
+        thumbnail_picker.segment_end(segment_end)
+        yield segment
+
+
+def thumbnail_picker_lag(frame_prefetch: int, frame_stride: int) -> int:
+    # how many frames decoding can be ahead of the segment finder finding where a
+    # segment ended: the frames waiting to be compared, plus a stride being compared
+    return frame_prefetch + FRAME_RING_SIZE + frame_stride + 1
+
+
+def segmentize_thumbnail_picker(
+    settings: SegmentizeSettings, frame_start: int
+) -> ThumbnailPicker | None:
+    if not settings.thumbnails:
+        return None
+    return ThumbnailPicker(
+        frame_start,
+        thumbnail_picker_lag(settings.frame_prefetch, settings.frame_stride),
+    )
+
+
+def extract_subtitle_region(
+    frame: Frame, layout: SubtitleLayout = SUBTITLE_LAYOUT_DEFAULT
+) -> Frame:
+    top, bottom, left, right = subtitle_region_bounds(*frame.shape[:2], layout)
+    subtitle_region = frame[top:bottom, left:right]
     return subtitle_region
 
 
 SegmentWithText = tuple[int, int, str]
 
 
+# the cache key is set when the text still has to be put in the ocr cache
+SegmentQueued = tuple[int, int, Future[str], str | None]
+
+
 def segments_add_text_generator(
     segments: Iterator[Segment],
     lang: str,
+    ocr_engine: str = config.SEGMENTIZE_OCR_ENGINE_DEFAULT,
+    ocr_workers: int = config.SEGMENTIZE_OCR_WORKERS_DEFAULT,
+    cache: OcrCache | None = None,
+    profiler: Profiler | None = None,
 ) -> Iterator[SegmentWithText]:
-    for segment_start, segment_end, _score, subtitle_region in segments:
-        image = Image.fromarray(np.uint8(subtitle_region))
-        text = imagetotext.video_frame_extract_text(image, lang)
-        yield (segment_start, segment_end, str(text))
-
-
-SegmentWithTexts = tuple[int, int, set[str]]
+    def segment_text_result(segment_queued: SegmentQueued) -> SegmentWithText:
+        segment_start, segment_end, text_future, cache_key = segment_queued
+        text = str(text_future.result())
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, text)
+        return (segment_start, segment_end, text)
+
+    # ocr runs in the background while the next segments are found, with at most
+    # `OCR_QUEUE_PER_WORKER` segments per worker waiting before finding them blocks
+    segments_queued: deque[SegmentQueued] = deque()
+    with imagetotext.text_extractor_pool(
+        ocr_engine,
+        lang,
+        ocr_workers,
+        None if profiler is None else partial(profiler.function, "ocr"),
+    ) as submit:
+        for segment_start, segment_end, _score, subtitle_region in segments:
+            text_cached, cache_key = None, None
+            if cache is not None:
+                cache_key = ocr_cache_key(
+                    subtitle_region, lang, imagetotext.TESSERACT_CONFIG
+                )
+                text_cached = cache.get(cache_key)
+
+            text_future: Future[str]
+            if text_cached is not None:
+                text_future, cache_key = Future(), None
+                text_future.set_result(text_cached)
+            else:
+                # copied, the frame source reuses its buffers
+                image = Image.fromarray(np.array(subtitle_region, np.uint8))
+                text_future = submit(image)
+            segments_queued.append((segment_start, segment_end, text_future, cache_key))
+
+            if len(segments_queued) > ocr_workers * OCR_QUEUE_PER_WORKER:
+                yield segment_text_result(segments_queued.popleft())
+
+        while segments_queued:
+            yield segment_text_result(segments_queued.popleft())
+
+
+SegmentWithTexts = tuple[int, int, CaptionTexts]
 
 
 def segments_join_on_text(
     segments: Iterator[SegmentWithText],
     caption_text_similarity_cutoff: float,
+    segment_prev: SegmentWithTexts | None = None,
+    joined: Callable[[SegmentWithTexts], None] | None = None,
 ) -> Iterator[SegmentWithTexts]:
-    segment_start_start, segment_start_end, segment_start_text = next(segments)
-    segment_prev: SegmentWithTexts = (
-        segment_start_start,
-        segment_start_end,
-        {segment_start_text},
-    )
+    # `segment_prev` is a segment still pending from before, `joined` is called with
+    # the pending segment after every segment, when all segments before it have
+    # been yielded and consumed
+    if segment_prev is None:
+        segment_first = next(segments, None)
+        if segment_first is None:
+            return
+        segment_start_start, segment_start_end, segment_start_text = segment_first
+        segment_prev = (
+            segment_start_start,
+            segment_start_end,
+            CaptionTexts(segment_start_text),
+        )
     for segment in segments:
         # print("segment_prev", segment_prev)
         # print("segment", segment)
         segment_prev_start, _segment_prev_end, segment_prev_texts = segment_prev
         segment_start, segment_end, segment_text = segment
         if any(
-            levenshtein_similarity(segment_prev_text, segment_text)
-            > caption_text_similarity_cutoff
+            levenshtein_similarity_exceeds(
+                segment_prev_text, segment_text, caption_text_similarity_cutoff
+            )
             for segment_prev_text in segment_prev_texts
         ):
-            segments_merged = (
-                segment_prev_start,
-                segment_end,
-                segment_prev_texts | {segment_text},
-            )
+            segment_prev_texts.add(segment_text)
+            segments_merged = (segment_prev_start, segment_end, segment_prev_texts)
             segment = segments_merged
             # print("similar merged", segment)
         else:
             yield segment_prev
-            segment = (segment_start, segment_end, {segment_text})
+            segment = (segment_start, segment_end, CaptionTexts(segment_text))
 
         segment_prev = segment
+        if joined is not None:
+            joined(segment_prev)
+
+
+def texts_average(texts: CaptionTexts) -> str:
+    return texts.medoid()
 
 
-def levenshtein_similarity(str1, str2):
-    distance = levenshtein_distance(str1, str2)
-    if distance == 0:
-        return 1
+def segments_find(
+    frame_gen: Iterator[Frame],
+    caption_video_similarity_cutoff: float,
+    frame_similarity: ChangeDetector,
+    frame_stride: int,
+    frame_start: int = 0,
+) -> Iterator[Segment]:
+    if frame_stride > 1:
+        return segment_finder_strided(
+            frame_gen,
+            caption_video_similarity_cutoff,
+            frame_similarity,
+            frame_stride,
+            frame_start,
+        )
 
-    similarity = 1 - (distance / max(len(str1), len(str2)))
-    return similarity
+    frame_pair_gen: Iterator[FramePair] = frame_pair_generator(frame_gen, frame_start)
+    return segment_finder(
+        frame_pair_gen, caption_video_similarity_cutoff, frame_similarity, frame_start
+    )
 
 
-# chatgpt generated
-def levenshtein_distance(str1, str2):
-    if len(str1) < len(str2):
-        return levenshtein_distance(str2, str1)
+def segments_with_text(
+    frame_gen: Iterator[Frame],
+    lang: str,
+    settings: SegmentizeSettings,
+    frame_start: int,
+    cache: OcrCache | None,
+    profiler: Profiler | None,
+    thumbnail_picker: ThumbnailPicker | None = None,
+) -> Iterator[SegmentWithText]:
+    frame_similarity = profiled_function(
+        profiler,
+        "frame_similarity",
+        changedetect.change_detector(
+            settings.change_detector, settings.caption_video_similarity_cutoff
+        ),
+    )
+    segments = segments_find(
+        profiled_iterator(profiler, "frame_generator", frame_gen),
+        settings.caption_video_similarity_cutoff,
+        frame_similarity,
+        settings.frame_stride,
+        frame_start,
+    )
+    if thumbnail_picker is not None:
+        segments = segments_thumbnailed(segments, thumbnail_picker)
+    segments_with_text = segments_add_text_generator(
+        profiled_iterator(profiler, "segment_finder", segments),
+        lang,
+        settings.ocr_engine,
+        settings.ocr_workers,
+        cache,
+        profiler,
+    )
+    return profiled_iterator(
+        profiler, "segments_add_text_generator", segments_with_text
+    )
+
 
-    if len(str2) == 0:
-        return len(str1)
+# a chunk is `[frame_start, frame_end)`, `None` reading until the end of the video
+Chunk = tuple[int, int | None]
 
-    previous_row = range(len(str2) + 1)
-    for i, c1 in enumerate(str1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(str2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
 
-    return previous_row[-1]
+def video_chunks(frames_total: int, workers: int, frame_start: int = 0) -> list[Chunk]:
+    frames_left = frames_total - frame_start
+    chunks_count = max(
+        1, min(workers * CHUNKS_PER_WORKER, frames_left // CHUNK_FRAMES_MIN)
+    )
+    chunk_frames = frames_left // chunks_count
+    frame_starts = [frame_start + chunk * chunk_frames for chunk in range(chunks_count)]
+    # the last chunk reads to the end, `CAP_PROP_FRAME_COUNT` is only an estimate
+    return [*pairwise(frame_starts), (frame_starts[-1], None)]
 
 
-def texts_average(texts: set[str]) -> str:
-    levenshtein_distances_from_all = (
-        (
-            text,
-            sum(levenshtein_distance(text, other) for other in texts if text != other),
+def segments_with_text_chunk(
+    chunk: Chunk,
+    video_path: str,
+    lang: str,
+    settings: SegmentizeSettings,
+    layout: SubtitleLayout,
+) -> tuple[
+    list[SegmentWithText], OcrCacheStats, dict[str, StageStats], SegmentThumbnails
+]:
+    frame_start, frame_end = chunk
+    video: cv2.VideoCapture = cv2.VideoCapture(video_path)
+    region_shape = subtitle_region_shape(*video_size(video), layout)
+    profiler = Profiler() if settings.profile_path is not None else None
+    thumbnail_picker = segmentize_thumbnail_picker(settings, frame_start)
+
+    with (
+        frame_reader(
+            video,
+            video_path,
+            settings.frame_source,
+            frame_start,
+            layout,
+            None if thumbnail_picker is None else thumbnail_picker.offer,
+        ) as read_into,
+        frame_stream(
+            profiled_function(profiler, "decode", read_into),
+            region_shape,
+            settings.frame_prefetch,
+        ) as frames,
+        ocr_cache(settings.ocr_cache_path, settings.ocr_cache_max_entries) as cache,
+    ):
+        frame_gen: Iterator[Frame] = frames
+        if frame_end is not None:
+            # one frame of overlap, the pair across the chunk edge belongs to this chunk
+            frame_gen = islice(frame_gen, frame_end - frame_start + 1)
+        chunk_segments_with_text = list(
+            segments_with_text(
+                frame_gen,
+                lang,
+                settings,
+                frame_start,
+                cache,
+                profiler,
+                thumbnail_picker,
+            )
         )
-        for text in texts
+    stages = {} if profiler is None else profiler.stop()
+    segment_thumbnails = (
+        {} if thumbnail_picker is None else thumbnail_picker.segment_thumbnails
     )
-    text_smallest_dist, _smallest_dist = min(
-        levenshtein_distances_from_all, key=lambda x: x[1]
+    return (
+        chunk_segments_with_text,
+        ocr_cache_stats(cache),
+        stages,
+        segment_thumbnails,
     )
 
-    return text_smallest_dist
-
 
-@contextmanager
-def csv_rowwriter(filename, mode):
-    with open(filename, mode, newline="") as f:
-        yield csv.writer(f).writerow
+def segments_stitch(
+    chunks_segments: Iterable[list[SegmentWithText]], segment_start: int = 0
+) -> Iterator[SegmentWithText]:
+    # a chunk doesn't know where the segment it starts in began, but segments are
+    # contiguous so it's always right after where the previous one ended
+    segment_end_prev = segment_start - 1
+    for chunk_segments in chunks_segments:
+        for _segment_start, segment_end, text in chunk_segments:
+            yield (segment_end_prev + 1, segment_end, text)
+            segment_end_prev = segment_end
 
 
 def segmentize(
     video_path: str,
     lang: str,
     outfile: str,
-    caption_video_similarity_cutoff: float = config.SEGMENTIZE_CAPTION_VIDEO_SIMILARITY_CUTOFF_DEFAULT,
-    caption_text_similarity_cutoff: float = config.SEGMENTIZE_CAPTION_TEXT_SIMILARITY_CUTOFF_DEFAULT,
+    settings: SegmentizeSettings = SEGMENTIZE_SETTINGS_DEFAULT,
+    resume: bool = False,
+    segment_sink: Callable[[SegmentRawText], None] | None = None,
 ) -> None:
+    wall_start = time.perf_counter()
     video: cv2.VideoCapture = cv2.VideoCapture(video_path)
 
     # fps: float = video.get(cv2.CAP_PROP_FPS)
 
     frames_total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-
-    frame_gen: Iterator[Frame] = iter(
-        tqdm(frame_generator(video), total=frames_total, unit="frame")
-    )
-    frame_pair_gen: Iterator[FramePair] = frame_pair_generator(frame_gen)
-    segments_gen: Iterator[Segment] = segment_finder(
-        frame_pair_gen, caption_video_similarity_cutoff
-    )
-    segments_with_text: Iterator[SegmentWithText] = segments_add_text_generator(
-        segments_gen, lang
+    layout = subtitlelayout.subtitle_layout(
+        video, video_path, settings.subtitle_layout, settings.layout_profiles
     )
-    segments_joined_text: Iterator[SegmentWithTexts] = segments_join_on_text(
-        segments_with_text, caption_text_similarity_cutoff
+    region_shape = subtitle_region_shape(*video_size(video), layout)
+
+    checkpoint_params = {
+        "video_path": os.path.abspath(video_path),
+        "video_size": os.path.getsize(video_path),
+        "lang": lang,
+        "caption_video_similarity_cutoff": settings.caption_video_similarity_cutoff,
+        "caption_text_similarity_cutoff": settings.caption_text_similarity_cutoff,
+        "frame_source": settings.frame_source,
+        "change_detector": settings.change_detector,
+        "frame_stride": settings.frame_stride,
+        "layout": list(layout),
+    }
+    resume_from = checkpoint_resumable(outfile, checkpoint_params) if resume else None
+    if resume_from is not None and resume_from.complete:
+        print(f"{outfile} is already complete")
+        return
+    frame_start = 0 if resume_from is None else resume_from.frame
+    if frame_start:
+        print(f"resuming from frame {frame_start}")
+
+    if settings.thumbnails and settings.frame_source != "opencv":
+        print("[warn] thumbnails need the opencv frame source, not keeping them")
+        settings = settings._replace(thumbnails=False)
+    thumbnails_dir = thumbnails_path(outfile) if settings.thumbnails else None
+    if thumbnails_dir is not None and resume_from is None:
+        thumbnails_reset(thumbnails_dir)
+
+    profiler = Profiler() if settings.profile_path is not None else None
+    write = partial(
+        segments_write,
+        outfile=outfile,
+        caption_text_similarity_cutoff=settings.caption_text_similarity_cutoff,
+        checkpoint_params=checkpoint_params,
+        checkpoint_every=settings.checkpoint_every,
+        resume_from=resume_from,
+        profiler=profiler,
+        thumbnails_dir=thumbnails_dir,
+        segment_sink=segment_sink,
     )
-    segments_has_text: Iterator[SegmentWithTexts] = (
-        (start, end, texts)
-        for start, end, texts in segments_joined_text
-        if texts != {""}
-    )
-    segments_no_short: Iterator[SegmentWithTexts] = (
-        (start, end, texts)
-        for start, end, texts in segments_has_text
-        if end - start > 3
-    )
-    segments_average_text: Iterator[SegmentWithText] = (
-        (start, end, texts_average(texts)) for start, end, texts in segments_no_short
-    )
-    segments_out = segments_average_text
 
-    with csv_rowwriter(outfile, "w") as writerow:
-        writerow(SegmentRawText._fields)
+    def profile_report(stages_chunks: Iterable[dict[str, StageStats]] = ()) -> None:
+        if profiler is None or settings.profile_path is None:
+            return
+        stages = profiler.stop()
+        for stages_chunk in stages_chunks:
+            stages = stages_merge(stages, stages_chunk)
+        info = {
+            "video_path": video_path,
+            "frames": frames_total,
+            "workers": settings.workers,
+        }
+        profile_report_write(
+            settings.profile_path, time.perf_counter() - wall_start, stages, info
+        )
 
-    for segment_start_frame, segment_end_frame, text in segments_out:
-        segment = SegmentRawText(str(segment_start_frame), str(segment_end_frame), text)
-        with csv_rowwriter(outfile, "a") as writerow:
-            writerow(segment)
+    if settings.workers > 1:
+        chunks = video_chunks(frames_total, settings.workers, frame_start)
+        chunk_segments = partial(
+            segments_with_text_chunk,
+            video_path=video_path,
+            lang=lang,
+            settings=settings,
+            layout=layout,
+        )
+        chunks_cache_stats: list[OcrCacheStats] = []
+        chunks_stages: list[dict[str, StageStats]] = []
+        segment_thumbnails: SegmentThumbnails = {}
+
+        def chunks_segments(
+            chunks_results: Iterable[
+                tuple[
+                    list[SegmentWithText],
+                    OcrCacheStats,
+                    dict[str, StageStats],
+                    SegmentThumbnails,
+                ]
+            ],
+        ) -> Iterator[list[SegmentWithText]]:
+            for (
+                chunk_segments_with_text,
+                chunk_cache_stats,
+                stages,
+                chunk_segment_thumbnails,
+            ) in chunks_results:
+                chunks_cache_stats.append(chunk_cache_stats)
+                chunks_stages.append(stages)
+                # chunks are in order, so the thumbnails stay ordered by end frame
+                segment_thumbnails.update(chunk_segment_thumbnails)
+                yield chunk_segments_with_text
+
+        with ProcessPoolExecutor(max_workers=settings.workers) as executor:
+            chunks_results = tqdm(
+                executor.map(chunk_segments, chunks), total=len(chunks), unit="chunk"
+            )
+            # waiting for the workers counts towards stitching
+            write(
+                profiled_iterator(
+                    profiler,
+                    "segments_stitch",
+                    segments_stitch(chunks_segments(chunks_results), frame_start),
+                ),
+                segment_thumbnails=segment_thumbnails,
+            )
+
+        if settings.ocr_cache_path is not None:
+            ocr_cache_report(
+                OcrCacheStats(
+                    sum(stats.hits for stats in chunks_cache_stats),
+                    sum(stats.misses for stats in chunks_cache_stats),
+                )
+            )
+        profile_report(chunks_stages)
+        return
+
+    thumbnail_picker = segmentize_thumbnail_picker(settings, frame_start)
+    with (
+        frame_reader(
+            video,
+            video_path,
+            settings.frame_source,
+            frame_start,
+            layout,
+            None if thumbnail_picker is None else thumbnail_picker.offer,
+        ) as read_into,
+        frame_stream(
+            profiled_function(profiler, "decode", read_into),
+            region_shape,
+            settings.frame_prefetch,
+        ) as frames,
+        ocr_cache(settings.ocr_cache_path, settings.ocr_cache_max_entries) as cache,
+    ):
+        frame_gen: Iterator[Frame] = iter(
+            tqdm(frames, total=frames_total, initial=frame_start, unit="frame")
+        )
+        write(
+            segments_with_text(
+                frame_gen,
+                lang,
+                settings,
+                frame_start,
+                cache,
+                profiler,
+                thumbnail_picker,
+            ),
+            segment_thumbnails=(
+                None
+                if thumbnail_picker is None
+                else thumbnail_picker.segment_thumbnails
+            ),
+        )
+
+        if cache is not None:
+            ocr_cache_report(cache.stats())
+    profile_report()
+
+
+def segments_write(
+    segments_with_text: Iterator[SegmentWithText],
+    outfile: str,
+    caption_text_similarity_cutoff: float,
+    checkpoint_params: dict[str, Any],
+    checkpoint_every: int,
+    resume_from: SegmentizeCheckpoint | None = None,
+    profiler: Profiler | None = None,
+    thumbnails_dir: Path | None = None,
+    segment_thumbnails: SegmentThumbnails | None = None,
+    segment_sink: Callable[[SegmentRawText], None] | None = None,
+) -> None:
+    # `segment_sink` gets every segment once it's written, thumbnail and all
+    checkpoint_file = checkpoint_path(outfile)
+    segment_pending: SegmentWithTexts | None = None
+    if resume_from is None:
+        with open(outfile, "w", newline="") as f:
+            csv.writer(f).writerow(SegmentRawText._fields)
+    else:
+        # rows written after the checkpoint are found again
+        os.truncate(outfile, resume_from.csv_offset)
+        if resume_from.segment_pending is not None:
+            start, end, counts = resume_from.segment_pending
+            segment_pending = (start, end, CaptionTexts.from_counts(counts))
+
+    with open(outfile, "a", newline="") as f:
+        writerow = profiled_function(profiler, "csv_write", csv.writer(f).writerow)
+        frame = 0 if resume_from is None else resume_from.frame
+        segments_joined = 0
+
+        def checkpoint(complete: bool = False) -> None:
+            f.flush()
+            segment_pending_counts = None
+            if segment_pending is not None:
+                start, end, texts = segment_pending
+                segment_pending_counts = (start, end, dict(texts.counts))
+            checkpoint_write(
+                checkpoint_file,
+                SegmentizeCheckpoint(
+                    checkpoint_params,
+                    frame,
+                    segment_pending_counts,
+                    f.tell(),
+                    complete,
+                ),
+            )
+
+        def joined(segment: SegmentWithTexts) -> None:
+            nonlocal segment_pending, frame, segments_joined
+            _start, end, _texts = segment
+            segment_pending, frame = segment, end + 1
+            segments_joined += 1
+            if segments_joined % checkpoint_every == 0:
+                checkpoint()
+
+        checkpoint()
+
+        segments_joined_text: Iterator[SegmentWithTexts] = profiled_iterator(
+            profiler,
+            "segments_join_on_text",
+            segments_join_on_text(
+                segments_with_text,
+                caption_text_similarity_cutoff,
+                segment_pending,
+                joined,
+            ),
+        )
+        average = profiled_function(profiler, "texts_average", texts_average)
+        segments_has_text: Iterator[SegmentWithTexts] = (
+            (start, end, texts)
+            for start, end, texts in segments_joined_text
+            if list(texts) != [""]
+        )
+        segments_no_short: Iterator[SegmentWithTexts] = (
+            (start, end, texts)
+            for start, end, texts in segments_has_text
+            if end - start > 3
+        )
+        segments_average_text: Iterator[SegmentWithText] = (
+            (start, end, average(texts)) for start, end, texts in segments_no_short
+        )
+        segments_out = segments_average_text
+
+        for segment_start_frame, segment_end_frame, text in segments_out:
+            segment_raw = SegmentRawText(
+                str(segment_start_frame), str(segment_end_frame), text
+            )
+            writerow(segment_raw)
+            if thumbnails_dir is not None and segment_thumbnails is not None:
+                segment_thumbnail_write(
+                    segment_thumbnails,
+                    thumbnails_dir,
+                    segment_start_frame,
+                    segment_end_frame,
+                )
+            if segment_sink is not None:
+                segment_sink(segment_raw)
+
+        checkpoint(complete=True)
@@ -0,0 +1,155 @@
+import queue
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+import cv2
+
+from . import ankicards, segmentcleaner
+from .mediastore import MediaStoreSettings, media_store
+from .segment import SegmentRawText
+from .thumbnails import thumbnails_read
+
+SegmentSink = Callable[[SegmentRawText], None]
+
+
+class MediaPrefetch:
+    # cuts the media of the segments segmentize writes in a thread while it goes on
+    # through the video, so most of it is there by the time the cards are made. cards
+    # are made the usual way after, which finds the media already cut.
+
+    def __init__(
+        self,
+        video_path: str,
+        video_ini_path: str,
+        thumbnails_dir: str | None,
+        media_store_path: str | None,
+        media_store_settings: MediaStoreSettings,
+    ):
+        self.segments: queue.Queue[SegmentRawText | None] = queue.Queue()
+        self.error: Exception | None = None
+        self.thread = threading.Thread(
+            target=self.run,
+            args=(
+                video_path,
+                video_ini_path,
+                thumbnails_dir,
+                media_store_path,
+                media_store_settings,
+            ),
+            name="media_prefetch",
+        )
+        self.thread.start()
+
+    def put(self, segment_raw: SegmentRawText) -> None:
+        # what the non-interactive cleaner would drop has no card
+        if segmentcleaner.segment_raw_is_valid(segment_raw):
+            self.segments.put(segment_raw)
+
+    def batch(self) -> tuple[list[SegmentRawText], bool]:
+        # whatever is waiting, up to what one ffmpeg cuts, `True` once it's the last
+        batch = [self.segments.get()]
+        while len(batch) < ankicards.AUDIO_CLIPS_PER_FFMPEG:
+            try:
+                batch.append(self.segments.get_nowait())
+            except queue.Empty:
+                break
+        return [segment for segment in batch if segment is not None], None in batch
+
+    def run(
+        self,
+        video_path: str,
+        video_ini_path: str,
+        thumbnails_dir: str | None,
+        media_store_path: str | None,
+        media_store_settings: MediaStoreSettings,
+    ) -> None:
+        video_id, _video_title, _video_url = ankicards.read_ini(video_ini_path)
+        video = cv2.VideoCapture(video_path)
+        fps = video.get(cv2.CAP_PROP_FPS)
+        try:
+            # the store is opened here, its connection can't be shared across threads
+            with media_store(media_store_path, media_store_settings) as store:
+                card_media = ankicards.CardMedia(video_path, [], store)
+                last = False
+                while not last:
+                    segments_raw, last = self.batch()
+                    if not segments_raw:
+                        continue
+                    segments = [
+                        segmentcleaner.segment_raw_text_to_segment(segment_raw)
+                        for segment_raw in segments_raw
+                    ]
+                    # thumbnails are written before segments are handed over
+                    if thumbnails_dir is not None:
+                        card_media.thumbnail_files = thumbnails_read(
+                            Path(thumbnails_dir)
+                        )
+                    clips = [
+                        ankicards.segment_clip(segment, video_id, fps)
+                        for segment in segments
+                    ]
+                    card_media.cut(
+                        video,
+                        clips,
+                        [
+                            (id_anki_card, ankicards.segment_mid_frame(segment))
+                            for (id_anki_card, _, _), segment in zip(
+                                clips, segments, strict=True
+                            )
+                        ],
+                        progress=False,
+                    )
+                card_media.write()
+        except Exception as e:
+            self.error = e
+        finally:
+            video.release()
+
+    def close(self) -> None:
+        self.segments.put(None)
+        self.thread.join()
+        if self.error is not None:
+            print(
+                f"[warn] cutting media while segmentizing failed, cutting it after:"
+                f" {self.error}"
+            )
+
+
+def segmentize_streamed_to_frame_cards(
+    segmentize_run: Callable[[SegmentSink], None],
+    video_path: str,
+    video_ini_path: str,
+    segments_raw_file: str,
+    segments_cleaned_file: str,
+    ankicards_file: str,
+    thumbnails_dir: str | None,
+    media_store_path: str | None,
+    media_store_settings: MediaStoreSettings,
+) -> None:
+    # segmentize, clean and make frame cards in one go, cutting the media of every
+    # segment once it's found instead of after the whole video is
+    prefetch = MediaPrefetch(
+        video_path,
+        video_ini_path,
+        thumbnails_dir,
+        media_store_path,
+        media_store_settings,
+    )
+    try:
+        segmentize_run(prefetch.put)
+    finally:
+        prefetch.close()
+
+    # the csvs are still written, from all the segments, a resumed segmentize only
+    # hands over the ones after where it resumed
+    segmentcleaner.clean(segments_raw_file, segments_cleaned_file)
+    ankicards.segments_to_frame_cards(
+        video_path,
+        video_ini_path,
+        segments_cleaned_file,
+        ankicards_file,
+        thumbnails_dir,
+        media_store_path,
+        media_store_settings,
+    )
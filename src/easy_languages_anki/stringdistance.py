@@ -0,0 +1,91 @@
+# levenshtein distance with myers' bit-parallel algorithm (hyyrö's formulation for
+# edit distance). python ints are arbitrary precision, so a whole column of the dp
+# table fits in one int no matter how long the strings are.
+
+
+def _pattern_masks(pattern: str) -> dict[str, int]:
+    masks: dict[str, int] = {}
+    for i, c in enumerate(pattern):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    return masks
+
+
+def _levenshtein_distance_myers(pattern: str, text: str, max_distance: int) -> int:
+    # `len(pattern) <= len(text)`, returns `max_distance + 1` once it's certain the
+    # distance is more than `max_distance`
+    m, n = len(pattern), len(text)
+    if m == 0:
+        return n
+
+    masks = _pattern_masks(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+
+    pv, mv = full, 0
+    score = m
+    for j, c in enumerate(text, start=1):
+        eq = masks.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        # the rest of the text can bring the distance down by at most one per char
+        if score - (n - j) > max_distance:
+            return max_distance + 1
+
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+
+    return score
+
+
+def levenshtein_distance(str1: str, str2: str) -> int:
+    if len(str1) < len(str2):
+        str1, str2 = str2, str1
+    return _levenshtein_distance_myers(str2, str1, len(str1))
+
+
+def levenshtein_distance_bounded(str1: str, str2: str, max_distance: int) -> int:
+    # exact distance if it's at most `max_distance`, otherwise `max_distance + 1`
+    if abs(len(str1) - len(str2)) > max_distance:
+        return max_distance + 1
+    if str1 == str2:
+        return 0
+
+    if len(str1) < len(str2):
+        str1, str2 = str2, str1
+    return _levenshtein_distance_myers(str2, str1, max_distance)
+
+
+def levenshtein_similarity(str1: str, str2: str) -> float:
+    distance = levenshtein_distance(str1, str2)
+    if distance == 0:
+        return 1
+
+    similarity = 1 - (distance / max(len(str1), len(str2)))
+    return similarity
+
+
+def levenshtein_similarity_exceeds(str1: str, str2: str, cutoff: float) -> bool:
+    # `levenshtein_similarity(str1, str2) > cutoff` without computing distances that
+    # are too large to matter
+    length = max(len(str1), len(str2))
+    # one more than strictly needed so float rounding can't turn a pass into a fail
+    max_distance = int((1 - cutoff) * length) + 1
+
+    distance = levenshtein_distance_bounded(str1, str2, max_distance)
+    if distance > max_distance:
+        return False
+    if distance == 0:
+        return cutoff < 1
+
+    similarity = 1 - (distance / length)
+    return similarity > cutoff
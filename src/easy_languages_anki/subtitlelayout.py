@@ -0,0 +1,206 @@
+import configparser
+import json
+import os
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from .framesource import (
+    SUBTITLE_LAYOUT_DEFAULT,
+    SubtitleLayout,
+    subtitle_region_bounds,
+    video_size,
+)
+
+SUBTITLE_LAYOUTS = ("auto", "fixed")
+
+CALIBRATE_SAMPLES = 60
+
+# captions are always somewhere in the bottom half of the frame
+CALIBRATE_SEARCH_TOP = 0.5
+# this fraction of the video at its start and end is usually the intro and outro,
+# without captions
+CALIBRATE_SKIP = 0.05
+# captions are white or brightly colored text with a dark outline, so text pixels are
+# bright pixels right next to a strong edge, where there are many edges side by side
+CALIBRATE_CAPTION_BRIGHTNESS_MIN = 200
+CALIBRATE_CANNY_THRESHOLDS = (100, 200)
+# fraction of edge pixels in a horizontal window of this fraction of the frame width.
+# letters are strokes next to each other, the outline of an object only has one edge.
+CALIBRATE_EDGE_WINDOW = 0.05
+CALIBRATE_EDGE_DENSITY_MIN = 0.15
+# a sample only counts as captioned with at least this fraction of text pixels
+CALIBRATE_SAMPLE_TEXT_MIN = 0.001
+CALIBRATE_SAMPLES_CAPTIONED_MIN = 3
+# with fewer captioned samples than this the captions found may only be some of them,
+# so the layout is widened to also cover the fixed band and isn't kept for the channel
+CALIBRATE_SAMPLES_CAPTIONED_CONFIDENT = 10
+# rows with less text than this fraction of the row with the most text are background
+CALIBRATE_ROW_TEXT_SHARE_MIN = 0.1
+# columns are kept once text shows up in them in this many samples, lines of different
+# lengths should all fit
+CALIBRATE_COLUMN_SAMPLES_MIN = 2
+# added around the detected captions, as a fraction of the frame height and width
+CALIBRATE_MARGIN = 0.02
+
+
+def text_pixels(frame: np.ndarray) -> np.ndarray:
+    frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(frame_gray, *CALIBRATE_CANNY_THRESHOLDS)
+    edges_near = cv2.dilate(edges, np.ones((3, 3), np.uint8))
+    edge_window = max(int(CALIBRATE_EDGE_WINDOW * frame.shape[1]), 3)
+    edge_density = cv2.blur(edges.astype(np.float32) / 255, (edge_window, 1))
+    # brightest channel, yellow text is bright but not in grayscale
+    bright = frame.max(axis=2) >= CALIBRATE_CAPTION_BRIGHTNESS_MIN
+    return bright & (edges_near > 0) & (edge_density >= CALIBRATE_EDGE_DENSITY_MIN)
+
+
+def subtitle_layout_calibrate(
+    video: cv2.VideoCapture, samples: int
+) -> tuple[SubtitleLayout | None, int]:
+    # the layout and how many samples had captions, `None` when there aren't enough
+    # captioned samples to tell where the captions are
+    height, width = video_size(video)
+    frames_total = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    search_top = int(CALIBRATE_SEARCH_TOP * height)
+
+    frame_nums = np.linspace(
+        frames_total * CALIBRATE_SKIP,
+        frames_total * (1 - CALIBRATE_SKIP),
+        samples,
+        dtype=int,
+    )
+    # how many samples each pixel was text in
+    text_counts = np.zeros((height - search_top, width), np.int32)
+    samples_captioned = 0
+    for frame_num in frame_nums:
+        video.set(cv2.CAP_PROP_POS_FRAMES, int(frame_num))
+        ret, frame = video.read()
+        if not ret:
+            continue
+        text = text_pixels(frame[search_top:])
+        if text.mean() >= CALIBRATE_SAMPLE_TEXT_MIN:
+            text_counts += text
+            samples_captioned += 1
+    video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    if samples_captioned < CALIBRATE_SAMPLES_CAPTIONED_MIN:
+        return None, samples_captioned
+
+    row_text = text_counts.sum(axis=1)
+    (rows,) = np.nonzero(row_text >= CALIBRATE_ROW_TEXT_SHARE_MIN * row_text.max())
+    top, bottom = rows[0], rows[-1] + 1
+
+    column_samples = text_counts[top:bottom].max(axis=0)
+    (columns,) = np.nonzero(column_samples >= CALIBRATE_COLUMN_SAMPLES_MIN)
+    if len(columns) == 0:
+        return None, samples_captioned
+    left, right = columns[0], columns[-1] + 1
+
+    layout = SubtitleLayout(
+        max((search_top + top) / height - CALIBRATE_MARGIN, 0),
+        min((search_top + bottom) / height + CALIBRATE_MARGIN, 1),
+        max(left / width - CALIBRATE_MARGIN, 0),
+        min(right / width + CALIBRATE_MARGIN, 1),
+    )
+    return layout, samples_captioned
+
+
+def subtitle_layout_widened(layout: SubtitleLayout) -> SubtitleLayout:
+    # covers the fixed band too, so captions the calibration missed aren't cut off
+    return SubtitleLayout(
+        min(layout.top, SUBTITLE_LAYOUT_DEFAULT.top),
+        max(layout.bottom, SUBTITLE_LAYOUT_DEFAULT.bottom),
+        min(layout.left, SUBTITLE_LAYOUT_DEFAULT.left),
+        max(layout.right, SUBTITLE_LAYOUT_DEFAULT.right),
+    )
+
+
+def subtitle_layout_describe(layout: SubtitleLayout, height: int, width: int) -> str:
+    top, bottom, left, right = subtitle_region_bounds(height, width, layout)
+    return (
+        f"rows {top}-{bottom} ({layout.top:.0%}-{layout.bottom:.0%}),"
+        f" columns {left}-{right} ({layout.left:.0%}-{layout.right:.0%})"
+    )
+
+
+def video_channel(video_path: str) -> str | None:
+    # from the ini `videodl` writes next to the video
+    video_ini_path = Path(video_path).with_suffix(".ini")
+    config = configparser.ConfigParser()
+    config.read(video_ini_path)
+    return config.get("video", "channel", fallback=None)
+
+
+def layout_profiles_read(path: Path) -> dict[str, SubtitleLayout]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return {key: SubtitleLayout(*layout) for key, layout in json.load(f).items()}
+
+
+def layout_profiles_write(path: Path, profiles: dict[str, SubtitleLayout]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(path_tmp, "w") as f:
+        json.dump({key: list(layout) for key, layout in profiles.items()}, f, indent=2)
+    os.replace(path_tmp, path)
+
+
+def subtitle_layout(
+    video: cv2.VideoCapture,
+    video_path: str,
+    mode: str,
+    profiles_path: str | None,
+    samples: int = CALIBRATE_SAMPLES,
+) -> SubtitleLayout:
+    if mode == "fixed":
+        return SUBTITLE_LAYOUT_DEFAULT
+    if mode != "auto":
+        raise ValueError(f"unknown subtitle layout: {mode}")
+
+    # channels keep their caption style between videos, so a layout is calibrated once
+    # per channel and resolution. videos without a known channel are calibrated each
+    # time.
+    height, width = video_size(video)
+    channel = video_channel(video_path)
+    profile_key = None
+    if channel is not None and profiles_path is not None:
+        profile_key = f"{channel}/{width}x{height}"
+        profiles = layout_profiles_read(Path(profiles_path).expanduser())
+        if profile_key in profiles:
+            layout = profiles[profile_key]
+            print(
+                f"subtitle layout of {profile_key} from {profiles_path}:"
+                f" {subtitle_layout_describe(layout, height, width)}"
+            )
+            return layout
+
+    layout, samples_captioned = subtitle_layout_calibrate(video, samples)
+    if layout is None:
+        print(
+            f"[warn] couldn't find the captions, only {samples_captioned}/{samples}"
+            " samples had any, using the default subtitle region"
+        )
+        return SUBTITLE_LAYOUT_DEFAULT
+    print(
+        f"subtitle layout from {samples_captioned}/{samples} captioned samples:"
+        f" {subtitle_layout_describe(layout, height, width)}"
+    )
+    if samples_captioned < CALIBRATE_SAMPLES_CAPTIONED_CONFIDENT:
+        layout = subtitle_layout_widened(layout)
+        print(
+            "[warn] too few captioned samples to be sure, not keeping it for the"
+            " channel and widening it to cover the default subtitle region:"
+            f" {subtitle_layout_describe(layout, height, width)}"
+        )
+        return layout
+
+    if profile_key is not None and profiles_path is not None:
+        # re-read, another run may have added profiles in the meantime
+        profiles = layout_profiles_read(Path(profiles_path).expanduser())
+        profiles[profile_key] = layout
+        layout_profiles_write(Path(profiles_path).expanduser(), profiles)
+
+    return layout
@@ -0,0 +1,118 @@
+import shutil
+import threading
+from bisect import bisect_right
+from collections import deque
+from itertools import takewhile
+from pathlib import Path
+
+import cv2
+
+from .framesource import Frame
+
+# frames are scored on a smaller copy, blur shows just as well there
+SHARPNESS_SCALE = 0.25
+
+# a frame kept for the segment it's in, `(frame_num, sharpness, frame)`
+Thumbnail = tuple[int, float, Frame]
+# the thumbnail of a found segment by its end frame, `(sharpness, jpeg)`
+SegmentThumbnails = dict[int, tuple[float, bytes]]
+
+
+def frame_sharpness(frame: Frame) -> float:
+    small = cv2.resize(
+        frame,
+        None,
+        fx=SHARPNESS_SCALE,
+        fy=SHARPNESS_SCALE,
+        interpolation=cv2.INTER_AREA,
+    )
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+def thumbnail_sharper(thumbnail: Thumbnail | None, other: Thumbnail) -> Thumbnail:
+    return other if thumbnail is None or other[1] > thumbnail[1] else thumbnail
+
+
+class ThumbnailPicker:
+    # keeps the sharpest full frame of every segment. frames are offered as they're
+    # decoded, up to `lag` frames before the segment finder says where a segment ended,
+    # so the last `lag` frames are kept until it's known which segment they're in.
+
+    def __init__(self, frame_start: int, lag: int):
+        self.lag = lag
+        self.frame_next = frame_start
+        self.recent: deque[Thumbnail] = deque()
+        # sharpest of the frames before `recent` in the segment that's still open
+        self.sharpest: Thumbnail | None = None
+        self.lock = threading.Lock()
+        self.segment_thumbnails: SegmentThumbnails = {}
+
+    def offer(self, frame: Frame) -> None:
+        sharpness = frame_sharpness(frame)
+        with self.lock:
+            # copied, the frame source reuses its buffers
+            self.recent.append((self.frame_next, sharpness, frame.copy()))
+            self.frame_next += 1
+            if len(self.recent) > self.lag:
+                self.sharpest = thumbnail_sharper(self.sharpest, self.recent.popleft())
+
+    def segment_end(self, frame_end: int) -> None:
+        with self.lock:
+            sharpest, self.sharpest = self.sharpest, None
+            while self.recent and self.recent[0][0] <= frame_end:
+                sharpest = thumbnail_sharper(sharpest, self.recent.popleft())
+        if sharpest is None:
+            return
+        _frame_num, sharpness, frame = sharpest
+        _, jpeg = cv2.imencode(".jpg", frame)
+        self.segment_thumbnails[frame_end] = (sharpness, jpeg.tobytes())
+
+
+def thumbnails_path(outfile: str) -> Path:
+    return Path(f"{outfile}.thumbnails")
+
+
+def thumbnails_reset(path: Path) -> None:
+    # thumbnails of an earlier run could be of segments that aren't found anymore
+    shutil.rmtree(path, ignore_errors=True)
+    path.mkdir(parents=True)
+
+
+def segment_thumbnail_write(
+    segment_thumbnails: SegmentThumbnails, path: Path, start: int, end: int
+) -> None:
+    # the sharpest of the found segments a written segment was joined from. segments
+    # are written in order, so the ones up to its end aren't needed after it.
+    ends = list(takewhile(lambda segment_end: segment_end <= end, segment_thumbnails))
+    thumbnails = [segment_thumbnails.pop(segment_end) for segment_end in ends]
+    thumbnails = [
+        thumbnail
+        for segment_end, thumbnail in zip(ends, thumbnails, strict=True)
+        if segment_end >= start
+    ]
+    if not thumbnails:
+        return
+    _sharpness, jpeg = max(thumbnails, key=lambda thumbnail: thumbnail[0])
+    (path / f"{start}-{end}.jpg").write_bytes(jpeg)
+
+
+# written thumbnails as `(start, end, path)`, by start frame
+ThumbnailFiles = list[tuple[int, int, Path]]
+
+
+def thumbnails_read(path: Path) -> ThumbnailFiles:
+    thumbnail_files: ThumbnailFiles = []
+    for thumbnail_path in path.glob("*.jpg"):
+        start, end = thumbnail_path.stem.split("-")
+        thumbnail_files.append((int(start), int(end), thumbnail_path))
+    return sorted(thumbnail_files)
+
+
+def thumbnail_for_frame(thumbnail_files: ThumbnailFiles, frame: int) -> Path | None:
+    # the thumbnail of the written segment the frame is in
+    i = bisect_right(thumbnail_files, frame, key=lambda thumbnail: thumbnail[0])
+    if i == 0:
+        return None
+    _start, end, thumbnail_path = thumbnail_files[i - 1]
+    return thumbnail_path if frame <= end else None
@@ -1,9 +1,17 @@
 import configparser
+from collections.abc import Mapping
 from pathlib import Path
 
 import youtube_dl
 
 
+def video_ini_write(ini_path: Path, video: Mapping[str, str]) -> None:
+    config = configparser.ConfigParser()
+    config["video"] = video
+    with open(ini_path, "w") as configfile:
+        config.write(configfile)
+
+
 def download_youtube(youtube_id: str, out_dir: Path) -> tuple[Path, Path]:
     url = f"https://www.youtube.com/watch?v={youtube_id}"
     filename = youtube_id
@@ -17,6 +25,7 @@ def download_youtube(youtube_id: str, out_dir: Path) -> tuple[Path, Path]:
         if not info:
             raise ValueError("`youtube-dl` returned no info")
         video_title = info.get("title")
+        channel_id = info.get("channel_id")
         ext = info.get("ext")
 
     config = configparser.ConfigParser()
@@ -32,8 +41,13 @@ def download_youtube(youtube_id: str, out_dir: Path) -> tuple[Path, Path]:
     else:
         print("[warn] `video_title` not returned by `youtube-dl`")
 
+    # segmentize keeps a subtitle layout per channel
+    if channel_id and type(channel_id) is str:
+        config["video"]["channel"] = channel_id
+    else:
+        print("[warn] `channel_id` not returned by `youtube-dl`")
+
     ini_path = out_dir / f"{filename}.ini"
-    with open(ini_path, "w") as configfile:
-        config.write(configfile)
+    video_ini_write(ini_path, config["video"])
 
     return Path(out_dir / f"{filename}.{ext}"), ini_path
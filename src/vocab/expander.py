@@ -1,16 +1,27 @@
 from collections.abc import Iterable, Iterator
 from itertools import groupby
 
+from easy_languages_anki import config
 from easy_languages_anki.segment import AnkiVideoFrameCard
 from vocab import vocab
-from vocab.vocab import Vocab
+from vocab.vocab import NLP_SETTINGS_DEFAULT, NlpSettings, Vocab
 
 
 def ankicards_diff_from_known_vocab(
-    vocab_known: Vocab, cards: Iterable[AnkiVideoFrameCard]
+    vocab_known: Vocab,
+    cards: Iterable[AnkiVideoFrameCard],
+    settings: NlpSettings = NLP_SETTINGS_DEFAULT,
+    batch_size: int = config.VOCAB_BATCH_SIZE_DEFAULT,
+    n_process: int = config.VOCAB_PROCESSES_DEFAULT,
 ) -> Iterator[tuple[int, Iterator[AnkiVideoFrameCard]]]:
+    # all of them are sorted by diff anyway
+    cards = list(cards)
+    vocabs_card = vocab.from_strings_each(
+        (card.learning for card in cards), settings, batch_size, n_process
+    )
     card_diffs = (
-        (card, ankicard_diff_from_known_vocab(vocab_known, card)) for card in cards
+        (card, len(vocab_card - vocab_known))
+        for card, vocab_card in zip(cards, vocabs_card, strict=True)
     )
     diff_groups = groupby(
         sorted(card_diffs, key=lambda cd: cd[1]), key=lambda cd: cd[1]
@@ -20,6 +31,10 @@ def ankicards_diff_from_known_vocab(
     )
 
 
-def ankicard_diff_from_known_vocab(vocab_known: Vocab, card: AnkiVideoFrameCard) -> int:
-    vocab_card = vocab.from_string(card.learning)
+def ankicard_diff_from_known_vocab(
+    vocab_known: Vocab,
+    card: AnkiVideoFrameCard,
+    settings: NlpSettings = NLP_SETTINGS_DEFAULT,
+) -> int:
+    vocab_card = vocab.from_string(card.learning, settings)
     return len(vocab_card - vocab_known)
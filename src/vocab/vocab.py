@@ -1,23 +1,70 @@
 import sys
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator
+from functools import cache
+from typing import TYPE_CHECKING, NamedTuple
 
-import spacy
+from easy_languages_anki import config
 
-nlp = spacy.load("es_core_news_md")
+if TYPE_CHECKING:
+    from spacy.language import Language
+    from spacy.tokens import Doc
 
 type Vocab = set[str]
 
 
-def from_string(text: str) -> Vocab:
-    return {
-        token.lemma_
-        for token in nlp(text.lower())
-        if not token.is_punct and not token.is_space
-    }
+class NlpSettings(NamedTuple):
+    model: str
+    # components of the model not loaded, only the lemmas are used
+    exclude: tuple[str, ...]
+
+
+NLP_SETTINGS_DEFAULT = NlpSettings(
+    config.VOCAB_SPACY_MODEL_DEFAULT, config.VOCAB_SPACY_EXCLUDE_DEFAULT
+)
+
+
+@cache
+def nlp_load(settings: NlpSettings = NLP_SETTINGS_DEFAULT) -> "Language":
+    # on first use, importing spacy and loading the model takes seconds, which
+    # anything only importing this shouldn't pay for
+    import spacy  # noqa: PLC0415
+
+    return spacy.load(settings.model, exclude=list(settings.exclude))
+
 
+def doc_vocab(doc: "Doc") -> Vocab:
+    return {token.lemma_ for token in doc if not token.is_punct and not token.is_space}
 
-def from_strings(texts: Iterable[str]) -> Vocab:
-    return {word for text in texts for word in from_string(text)}
+
+def from_string(text: str, settings: NlpSettings = NLP_SETTINGS_DEFAULT) -> Vocab:
+    return doc_vocab(nlp_load(settings)(text.lower()))
+
+
+def from_strings_each(
+    texts: Iterable[str],
+    settings: NlpSettings = NLP_SETTINGS_DEFAULT,
+    batch_size: int = config.VOCAB_BATCH_SIZE_DEFAULT,
+    n_process: int = config.VOCAB_PROCESSES_DEFAULT,
+) -> Iterator[Vocab]:
+    # the vocab of every text, in order. spacy lemmatizes them in batches, and in
+    # that many processes each loading its own copy of the model
+    docs = nlp_load(settings).pipe(
+        (text.lower() for text in texts), batch_size=batch_size, n_process=n_process
+    )
+    return (doc_vocab(doc) for doc in docs)
+
+
+def from_strings(
+    texts: Iterable[str],
+    settings: NlpSettings = NLP_SETTINGS_DEFAULT,
+    batch_size: int = config.VOCAB_BATCH_SIZE_DEFAULT,
+    n_process: int = config.VOCAB_PROCESSES_DEFAULT,
+) -> Vocab:
+    return {
+        word
+        for vocab in from_strings_each(texts, settings, batch_size, n_process)
+        for word in vocab
+    }
 
 
 if __name__ == "__main__":